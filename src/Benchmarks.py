@@ -0,0 +1,158 @@
+'''
+This module benchmarks the optimised analysis code against the original implementations.
+
+Run it directly to print the timings on scaled networks.
+'''
+
+import math
+import copy
+import timeit
+import io
+import contextlib
+import gc
+import tracemalloc
+from SimulationBasic import *
+import Metrics
+
+
+#-----------------------------------------------------------------------------
+# Original path metrics (one Python loop over a list of paths per metric)
+#-----------------------------------------------------------------------------
+
+def legacyMPL(allpath):
+    sum_path_length = 0
+    for path in allpath:
+        sum_path_length += int(len(path)-3)
+    return float(sum_path_length/len(allpath))
+
+def legacyMoPL(allpath):
+    NP = []
+    for path in allpath:
+        NP.append(int(len(path)-3))
+    return max(NP, key=NP.count)
+
+def legacySDPL(allpath):
+    sumation_DPL = 0
+    MPL = legacyMPL(allpath)
+    for path in allpath:
+        sumation_DPL += float(len(path) - 3 - MPL)**2
+    return math.sqrt(float(sumation_DPL / len(allpath)))
+
+def legacySP(allpath):
+    SP = []
+    for path in allpath:
+        SP.append(int(len(path)-3))
+    return min(SP)
+
+def legacyDecoyPath(allpath):
+    dsum = 0
+    for path in allpath:
+        if 'decoy_server' in path[len(path)-2].name:
+            dsum += 1
+    return dsum
+
+def legacyMetrics(allpath):
+    return [len(allpath), legacyMPL(allpath), legacyMoPL(allpath), legacySDPL(allpath), legacySP(allpath), legacyDecoyPath(allpath)]
+
+def vectorMetrics(harm):
+    return [Metrics.NP_metric(harm), Metrics.MPL_metric(harm), Metrics.MoPL_metric(harm), Metrics.SDPL_metric(harm),
+            Metrics.SP_metric(harm), Metrics.decoyPath(harm)]
+
+
+#-----------------------------------------------------------------------------
+# Scaled networks
+#-----------------------------------------------------------------------------
+
+def scaledNetwork(node_vlan_list, scale):
+    """
+    Build a createRealSDIoTScale network with the initial decoy deployment.
+    """
+    decoy_num = {'mri': 2, 'ct': 2, 'thermostat': 2, 'meter': 2, 'camera': 2, 'tv': 2, 'laptop': 2, 'server': 1}
+    intelligence = {'emulated': 0.9, 'real': 1.0}
+    #The network generator prints the whole network
+    with contextlib.redirect_stdout(io.StringIO()):
+        initial_net, decoy_net, decoy_list, initial_info = beforeShuffleScale(node_vlan_list, decoy_num, intelligence, 0.1, 0.01, scale)
+    return decoy_net
+
+
+def scaledHARM(node_vlan_list, scale):
+    """
+    Build the HARM of a createRealSDIoTScale network with the initial decoy deployment.
+    """
+    h = constructHARM(add_attacker(copyNet(scaledNetwork(node_vlan_list, scale))))
+    return h
+
+
+def benchmarkMetrics(node_vlan_list, scales, repeat=5):
+    """
+    Time the path metrics (NP, MPL, MoPL, SDPL, SP, decoy paths) with the original loops and the ragged numpy arrays.
+    """
+    print("scale  paths  legacy(s)  numpy(s)  speedup")
+    for scale in scales:
+        h = scaledHARM(node_vlan_list, scale)
+        #Enumerate paths outside the timings
+        allpath = list(h.model.allpath)
+        for a, b in zip(legacyMetrics(allpath), vectorMetrics(h)):
+            assert math.isclose(a, b, rel_tol=1e-9)
+        legacy = min(timeit.repeat(lambda: legacyMetrics(allpath), number=1, repeat=repeat))
+        #Include the ragged export, which is cached after the first call
+        h.model.allpath.ragged = None
+        vector = min(timeit.repeat(lambda: vectorMetrics(h), number=1, repeat=1))
+        print("%5d  %5d  %9.4f  %8.4f  %7.1f" % (scale, len(h.model.allpath), legacy, vector, legacy/vector))
+    return None
+
+
+def benchmarkCopy(node_vlan_list, scales, repeat=5):
+    """
+    Time copying a network with the initial decoy deployment by deepcopy (the original copyNet) and by copyNet,
+    which shares the vulnerability networks.
+    """
+    print("scale  nodes  deepcopy(s)  copyNet(s)  speedup")
+    for scale in scales:
+        net = scaledNetwork(node_vlan_list, scale)
+        deep = min(timeit.repeat(lambda: copy.deepcopy(net), number=1, repeat=repeat))
+        shared = min(timeit.repeat(lambda: copyNet(net), number=1, repeat=repeat))
+        print("%5d  %5d  %11.4f  %10.4f  %7.1f" % (scale, len(net.nodes), deep, shared, deep/shared))
+    return None
+
+
+def tracedBytes(build):
+    """
+    Measure the memory allocated by build() and still held by its result.
+
+    :returns: result and number of bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def benchmarkMemory(node_vlan_list, scale=20, copies=100):
+    """
+    Measure the memory of a createRealSDIoTScale2 network and of attack trees built for all of its nodes
+    without sharing (copies times), i.e. tens of thousands of tree nodes.
+    """
+    def build():
+        #The network generator prints the whole network
+        with contextlib.redirect_stdout(io.StringIO()):
+            return createRealSDIoTScale2(node_vlan_list, scale)
+    net, netBytes = tracedBytes(build)
+    netNodes = len(net.nodes) + sum([len(u.vul.nodes) for u in net.nodes if u.vul is not None])
+    trees, treeBytes = tracedBytes(lambda: [at(u.vul, 1, 1) for k in range(copies) for u in net.nodes if u.vul is not None])
+    treeNodes = sum([len(t.compile()) for t in trees])
+    print("model               nodes      bytes  bytes/node")
+    print("network %5d  %9d  %9d  %10.1f" % (scale, netNodes, netBytes, netBytes/netNodes))
+    print("attack trees   %9d  %9d  %10.1f" % (treeNodes, treeBytes, treeBytes/treeNodes))
+    return None
+
+
+if __name__ == '__main__':
+    node_vlan_list = [['mri', 'ct'], ['thermostat', 'meter', 'camera'], ['tv', 'laptop'], ['server']]
+    benchmarkMetrics(node_vlan_list, [5, 10, 15, 20])
+    benchmarkCopy(node_vlan_list, [5, 10, 15, 20])
+    benchmarkMemory(node_vlan_list)
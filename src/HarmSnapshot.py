@@ -0,0 +1,253 @@
+"""
+This module saves HARMs to compact binary snapshots (numpy npz) and loads them back.
+
+A snapshot holds the upper layer attack graph (node names, states and values, connections as
+CSR arrays), the computed attack paths (prefix trie arrays) and the lower layer attack trees as
+compiled programs (see at.compile). Trees shared by several nodes are stored once. Loading
+rebuilds the objects from flat arrays, without the network or the vulnerability networks, so
+sweeps and worker processes can reuse HARMs instead of rebuilding them.
+"""
+
+import numpy as np
+from harm import *
+
+
+#Encode True/False/None flags as 1/0/-1
+def encodeFlags(values):
+    return np.array([-1 if v is None else int(bool(v)) for v in values], dtype=np.int8)
+
+def decodeFlag(code):
+    if code < 0:
+        return None
+    return bool(code)
+
+#Encode node types (True for real nodes, a decoy type such as 'emulated', None for start and end)
+#as codes into a table of tagged strings, so they load back exactly
+def encodeTypes(values):
+    table = []
+    codes = []
+    for v in values:
+        if v is None or isinstance(v, bool):
+            tag = 'n:' if v is None else 'b:' + str(v)
+        else:
+            tag = 's:' + str(v)
+        if tag not in table:
+            table.append(tag)
+        codes.append(table.index(tag))
+    return np.array(codes, dtype=np.int64), np.array(table, dtype=str)
+
+def decodeTypes(codes, table):
+    values = []
+    for tag in table:
+        if tag == 'n:':
+            values.append(None)
+        elif tag.startswith('b:'):
+            values.append(tag == 'b:True')
+        else:
+            values.append(tag[2:])
+    return [values[k] for k in codes]
+
+#Encode numbers with None as NaN
+def encodeValues(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+def decodeValue(value):
+    if value != value:
+        return None
+    return value
+
+
+def saveHARM(h, filename, compressed=False):
+    """
+    Save a HARM with an attack graph upper layer and attack tree lower layers.
+    Lower layers are built and attack paths are kept only if they were already computed.
+
+    :param h: harm object
+    :param filename: file name (numpy adds .npz if missing)
+    :param compressed: compress the arrays (smaller files, slower loading)
+    :returns: None
+    """
+    model = h.model
+    if not isinstance(model, ag):
+        raise ValueError("Only HARMs with an attack graph upper layer can be saved")
+    topo = model.topology()
+    nodes = topo.nodes
+    data = {}
+    data['names'] = np.array(topo.names, dtype=str)
+    data['start'] = np.array([topo.idOf(model.s) if model.s is not None else -1], dtype=np.int64)
+    data['end'] = np.array([topo.idOf(model.e) if model.e is not None else -1], dtype=np.int64)
+    data['offsets'] = np.asarray(topo.offsets, dtype=np.int64)
+    data['targets'] = np.asarray(topo.targets, dtype=np.int64)
+    data['type'], data['typeTable'] = encodeTypes([u.type for u in nodes])
+    data['critical'] = encodeFlags([getattr(u, 'critical', None) for u in nodes])
+    data['comp'] = encodeFlags([getattr(u, 'comp', None) for u in nodes])
+    data['pro'] = encodeValues([u.pro for u in nodes])
+    data['prev_comp'] = encodeValues([getattr(u, 'prev_comp', None) for u in nodes])
+    data['val'] = encodeValues([u.val for u in nodes])
+    data['options'] = np.array([-1 if model.maxLength is None else model.maxLength,
+                                -1 if model.topK is None else model.topK], dtype=np.int64)
+    data['topMetric'] = np.array([model.topMetric], dtype=str)
+    data['systemRisk'] = encodeValues([getattr(h, 'system_risk', None)])
+
+    #Attack paths as prefix trie arrays
+    store = model._allpath
+    if store is not None and not isinstance(store, pathStore):
+        store = None
+    data['hasPaths'] = np.array([store is not None], dtype=bool)
+    for name in ['parent', 'node', 'depth', 'leaves']:
+        data['path_'+name] = np.array(getattr(store, name) if store is not None else [], dtype=np.int64)
+
+    #Lower layers as compiled programs, one per distinct tree
+    trees = {}
+    childOf = []
+    for u in nodes:
+        child = u.child
+        if child is None:
+            childOf.append(-1)
+            continue
+        if not isinstance(child, at):
+            raise ValueError("Only attack tree lower layers can be saved")
+        childOf.append(trees.setdefault(id(child), (len(trees), child))[0])
+    data['childOf'] = np.array(childOf, dtype=np.int64)
+
+    ops = []
+    leafVal = []
+    leafName = []
+    leafVul = []
+    gateChildren = []
+    gateOffsets = [0]
+    treeOffsets = [0]
+    for k, child in sorted(trees.values(), key=lambda item: item[0]):
+        program = child.program
+        if program is None:
+            program = child.compile()
+        for op, arg in program:
+            ops.append(op)
+            if op == OP_LEAF:
+                leafVal.append(float(arg.val))
+                leafName.append(arg.name)
+                leafVul.append(getattr(arg, 'vulname', ''))
+            else:
+                leafVal.append(0.0)
+                leafName.append('')
+                leafVul.append('')
+            if op == OP_AND or op == OP_OR:
+                gateChildren.extend(arg)
+            gateOffsets.append(len(gateChildren))
+        treeOffsets.append(len(ops))
+    data['tree_offsets'] = np.array(treeOffsets, dtype=np.int64)
+    data['tree_ops'] = np.array(ops, dtype=np.int8)
+    data['tree_val'] = np.array(leafVal, dtype=float)
+    data['tree_name'] = np.array(leafName, dtype=str)
+    data['tree_vul'] = np.array(leafVul, dtype=str)
+    data['tree_gateOffsets'] = np.array(gateOffsets, dtype=np.int64)
+    data['tree_gateChildren'] = np.array(gateChildren, dtype=np.int64)
+
+    if compressed:
+        np.savez_compressed(filename, **data)
+    else:
+        np.savez(filename, **data)
+    return None
+
+
+def loadTree(data, k):
+    """
+    Rebuild lower layer k of a snapshot: the gates, leaves and compiled program.
+    """
+    offsets = data['tree_offsets']
+    gateOffsets = data['tree_gateOffsets']
+    gateChildren = data['tree_gateChildren']
+    tree = at.__new__(at)
+    tree.nodes = []
+    tree.isAG = 0
+    objs = []
+    program = []
+    for i in range(offsets[k], offsets[k+1]):
+        op = data['tree_ops'][i]
+        if op == OP_LEAF:
+            if data['tree_vul'][i]:
+                u = tVulNode(data['tree_name'][i])
+                u.vulname = data['tree_vul'][i]
+            else:
+                u = tNode(data['tree_name'][i])
+            u.val = data['tree_val'][i]
+            program.append((OP_LEAF, u))
+        elif op == OP_OTHER:
+            u = None
+            program.append((OP_OTHER, None))
+        else:
+            u = andGate() if op == OP_AND else orGate()
+            children = tuple(gateChildren[gateOffsets[i]:gateOffsets[i+1]])
+            u.con = [objs[j] for j in children]
+            program.append((op, children))
+        objs.append(u)
+    tree.topGate = objs[-1]
+    tree.program = program
+    return tree
+
+
+def loadHARM(filename):
+    """
+    Load a HARM saved by saveHARM. Upper layer nodes are not linked to network nodes (n is None).
+
+    :param filename: snapshot file name
+    :returns: harm object
+    """
+    #Plain lists index much faster than numpy arrays element by element
+    with np.load(filename) as arrays:
+        data = {name: arrays[name].tolist() for name in arrays.files}
+    names = data['names']
+    offsets = data['offsets']
+    targets = data['targets']
+    types = decodeTypes(data['type'], data['typeTable'])
+    nodes = []
+    for i in range(0, len(names)):
+        u = gnode(names[i])
+        u.type = types[i]
+        u.critical = decodeFlag(data['critical'][i])
+        u.comp = decodeFlag(data['comp'][i])
+        u.pro = decodeValue(data['pro'][i])
+        u.prev_comp = decodeValue(data['prev_comp'][i])
+        u.val = decodeValue(data['val'][i])
+        nodes.append(u)
+    for i in range(0, len(names)):
+        nodes[i].con = [nodes[j] for j in targets[offsets[i]:offsets[i+1]]]
+
+    trees = {}
+    childOf = data['childOf']
+    for i in range(0, len(names)):
+        k = childOf[i]
+        if k >= 0:
+            if k not in trees:
+                trees[k] = loadTree(data, k)
+            nodes[i].child = trees[k]
+
+    model = ag.__new__(ag)
+    network.__init__(model)
+    model.path = []
+    model.isAG = 1
+    model._pathGraph = None
+    model.pruning = None
+    model.pathOrigin = None
+    model._nodeValues = None
+    model._allpath = None
+    start = data['start'][0]
+    end = data['end'][0]
+    model.s = nodes[start] if start >= 0 else None
+    model.e = nodes[end] if end >= 0 else None
+    model.nodes = [nodes[i] for i in range(0, len(names)) if i != start and i != end]
+    maxLength, topK = data['options']
+    model.maxLength = maxLength if maxLength >= 0 else None
+    model.topK = topK if topK >= 0 else None
+    model.topMetric = data['topMetric'][0]
+
+    if data['hasPaths'][0]:
+        store = pathStore(model.topology().nodes)
+        for name in ['parent', 'node', 'depth', 'leaves']:
+            getattr(store, name).extend(data['path_'+name])
+        model._allpath = store
+
+    h = harm()
+    h.model = model
+    h.system_risk = decodeValue(data['systemRisk'][0])
+    return h
@@ -8,46 +8,33 @@ import copy
 import math
 from SDIoTGen import *
 from SecurityEvaluator import *
+from PathCounting import *
 from random import *
 from sortedcontainers.sortedlist import SortedList
 
-def travelPath(conNode, dserver, path, allpath, oriNode):
-     
-    for v in conNode.con:
-        #print(v.name)
-        if v.inPath == 0: 
-            
-            #path.append(v.name) #Only append name
-            v.inPath = 1
-
-            #Recursively traverse the path until to the decoy server
-            if v.name != dserver.name:                
-                travelPath(v, dserver, path, allpath, oriNode)                            
-            else:
-                oriNode.num += 1
-                #oriNode.current_hop += len(path)
-                #allpath.append(path[:])
-                
-            #path.pop()
-            v.inPath = 0
-               
-    return None
-
 def travelNetAll(net, dserver): 
-    allpath = []
+    """
+    Count the paths from each real IoT node to the decoy server (stored in node.num).
+    Paths are counted on the network topology without enumerating them.
+    """
+    topo = net.topology()
+    #Paths stop at the decoy server
+    adj = []
+    weight = []
+    for i in range(0, len(topo)):
+        if topo.names[i] == dserver.name:
+            adj.append([])
+            weight.append(1)
+        else:
+            adj.append(topo.adj[i])
+            weight.append(0)
+    counts = countSimplePaths(adj, [True] * len(topo), weight)
 
     for node1 in net.nodes:
         if node1.type == True and node1.name.startswith("server") == False:
-             #node1.current_hop = 0
-             node1.num = 0
-             node1.inPath = 1
-             path = [node1.name]
-             travelPath(node1, dserver, path, allpath, node1) 
-             node1.inPath = 0
-             del path
+             node1.num = counts[topo.idOf(node1)]
              #print(node1.name, node1.num)
     
-    #print(allpath)
     return None
 
 def getNameList(path):
@@ -57,9 +44,7 @@ def getNameList(path):
     return temp
 
 def returnNode(net, name):
-    for n in net.nodes:
-        if n.name == name:
-            return n
+    return net.nodeByName(name)
 
 def returnMax(sortedList):
     val = 0
@@ -5,26 +5,33 @@ This module contains functions for calculating path-based metrics.
 """  
 
 import math
+import random
+import numpy as np
+from statistics import NormalDist
+
+#------------------------------------
+#Compute the lengths of paths (excluding start, attacker and end)
+#------------------------------------
+def pathLengths(harm):
+    flat, offsets = harm.model.pathArrays()
+    return np.diff(offsets) - 3
 
 #------------------------------------
 #Compute the number of paths
 #------------------------------------
 def NP_metric(harm):
     
-    value = len(harm.model.allpath)
+    value = harm.model.countPaths()
     return value
 
 #------------------------------------------
 #Compute the mean of path lengths
 #------------------------------------------
-def MPL_metric(harm):
+def MPL_metric(harm, lengths=None):
 
-    sum_path_length = 0
-    for path in harm.model.allpath:
-        sum_path_length += int(len(path)-3)
-        #print(sum_path_length)
-
-    value = float(sum_path_length/len(harm.model.allpath))
+    if lengths is None:
+        lengths = pathLengths(harm)
+    value = float(int(lengths.sum())/len(lengths))
 
     return value
 
@@ -33,11 +40,10 @@ def MPL_metric(harm):
 #----------------------------------------
 def MoPL_metric(harm):
     
-    NP = []
-    for path in harm.model.allpath:
-        NP.append(int(len(path)-3))
-
-    value = max(NP, key=NP.count)
+    lengths = pathLengths(harm)
+    counts = np.bincount(lengths)
+    #Ties go to the length that appears first in the path list
+    value = int(lengths[np.argmax(counts[lengths] == counts.max())])
     return value
 
 #----------------------------------------------------------
@@ -45,14 +51,12 @@ def MoPL_metric(harm):
 #----------------------------------------------------------
 def SDPL_metric(harm):
 
-    sumation_DPL = 0
-    MPL = MPL_metric(harm)
+    lengths = pathLengths(harm)
+    MPL = MPL_metric(harm, lengths)
     #print(MPL)
-    for path in harm.model.allpath:    
-        sumation_DPL += float(len(path) - 3 - MPL)**2
-        #print(sumation_DPL)
+    sumation_DPL = float(np.sum((lengths - MPL)**2))
 
-    value = math.sqrt(float(sumation_DPL / len(harm.model.allpath)))
+    value = math.sqrt(float(sumation_DPL / len(lengths)))
 
     return value
 
@@ -61,10 +65,7 @@ def SDPL_metric(harm):
 #--------------------------------------
 def SP_metric(harm):
 
-    SP=[]
-    for path in harm.model.allpath:
-        SP.append(int(len(path)-3))
-    value = min(SP)
+    value = int(pathLengths(harm).min())
     return value
 
 #===================================================================================
@@ -75,63 +76,140 @@ def decoyPath(h):
     @return: number of decoy attack paths
     @return: number of real attack paths
     """
-    dsum = 0
-    rsum = 0
-    for path in h.model.allpath:
-        if 'decoy_server' in path[len(path)-2].name:
-            dsum += 1
-        elif 'server' in path[len(path)-2].name:
-            rsum += 1
-    #print(dsum, float(dsum)/float(dsum+rsum))
+    #Count paths by the last node before the end point instead of enumerating them
+    dsum = h.model.countPaths(lambda n: 'decoy_server' in n.name)
+    #print(dsum)
     return dsum
 
 def decoyPathPct(harm):
     """
     @return: the percentage of attack paths with decoy nodes as entry points among all decoy attack paths (to decoy server)
     """
-    dsum = 0.0
-    rsum = 0.0
-    for path in harm.model.allpath:
-        if 'svrd' in path[len(path)-2].name:
-            dsum+=1.0
-        elif 'svr' in path[len(path)-2].name:
-            rsum+=1.0
+    dsum = harm.model.countPaths(lambda n: 'svrd' in n.name)
+    rsum = harm.model.countPaths(lambda n: 'svrd' not in n.name and 'svr' in n.name)
     return float(dsum)/float(dsum+rsum)
             
 
+def decoyPathArrays(harm):
+    """
+    @return: ragged path arrays, topology and the indexes of paths ending at a decoy server (svrd)
+    """
+    model = harm.model
+    flat, offsets = model.pathArrays()
+    topo = model.topology()
+    isTarget = np.array(['svrd' in name for name in topo.names], dtype=bool)
+    targets = np.nonzero(isTarget[flat[offsets[1:]-2]])[0] if len(flat) else np.zeros(0, dtype=np.int64)
+    return flat, offsets, topo, targets
+
 def decoyNodePct(harm):
-    dsum = 0.0
-    pct = 0.0
-    for path in harm.model.allpath:
-        if 'svrd' in path[len(path)-2].name:
-            dsum+=1.0
-            decoysum = 0.0
-            for n in path:
-                if n.name != 'ag_attacker' and n != harm.model.e and n != harm.model.s and n.type == False:
-                    decoysum+=1.0
-            pct+=float(decoysum/(len(path)-3.0))
-            #print("pct", pct)
-    if dsum == 0.0:
+    model = harm.model
+    flat, offsets, topo, targets = decoyPathArrays(harm)
+    if len(targets) == 0:
         return 0.0
-    return float(pct/dsum)
+    isDecoy = np.array([n.name != 'ag_attacker' and n != model.e and n != model.s and n.type == False for n in topo.nodes], dtype=float)
+    decoysum = np.add.reduceat(isDecoy[flat], offsets[:-1])[targets]
+    lengths = np.diff(offsets)[targets]
+    pct = float(np.sum(decoysum/(lengths-3.0)))
+    return float(pct/len(targets))
         
+def proceedProArrays(model, topo):
+    """
+    @return: probability of each node by topology id (1.0 for the start, end and attacker) and flags of \
+             the nodes without a probability (pro is None), which are only allowed off the attack paths \
+             to a decoy server
+    """
+    counted = [n.name != 'ag_attacker' and n != model.e and n != model.s for n in topo.nodes]
+    missing = np.array([c and n.pro is None for c, n in zip(counted, topo.nodes)], dtype=bool)
+    pro = np.array([float(n.pro) if c and n.pro is not None else 1.0 for c, n in zip(counted, topo.nodes)])
+    return pro, missing
+
+def missingProError():
+    return TypeError("A node on an attack path to a decoy server has no probability (pro is None)")
+
 def decoyProceedPro(harm):
-    dsum = 0.0
-    pro = 0.0
-    for path in harm.model.allpath:
-        if 'svrd' in path[len(path)-2].name:
-            dsum+=1.0
-            pro_path = 1.0
-            for n in path:
-                if n.name != 'ag_attacker' and n != harm.model.e and n != harm.model.s:
-                    #print(n.name)
-                    pro_path*=float(n.pro)
-            pro += pro_path
-            #print("pro", pro)
-        
-    if dsum == 0.0:
+    model = harm.model
+    flat, offsets, topo, targets = decoyPathArrays(harm)
+    if len(targets) == 0:
         return 1.0
-    return float(pro/dsum)
+    pro, missing = proceedProArrays(model, topo)
+    if np.add.reduceat(missing[flat], offsets[:-1])[targets].any():
+        raise missingProError()
+    pro_path = np.multiply.reduceat(pro[flat], offsets[:-1])[targets]
+    return float(np.sum(pro_path)/len(targets))
+
+#====================================================================================
+#Estimate path metrics by sampling random attack paths
+#====================================================================================
+def estimatePathMetrics(harm, samples=1000, rand=random, confidence=0.95):
+    """
+    Estimate NP, MPL, the number of decoy attack paths and decoyProceedPro from random attack paths
+    (see samplePath in attackGraph.py), for networks whose attack paths are too many to enumerate.
+    Totals are estimated by the mean of the weighted samples and means by the ratio of two totals,
+    with the variance of ratios from the delta method and normal confidence intervals.
+
+    :param samples: number of random attack paths (at least 1)
+    :param rand: random number generator
+    :param confidence: confidence level of the intervals
+    :returns: dictionary mapping each metric to (estimate, estimator variance, (lower, upper))
+    """
+    if samples < 1:
+        raise ValueError("estimatePathMetrics needs at least one sample, got %r" % (samples,))
+    model = harm.model
+    topo = model.topology()
+    isDecoy = np.array(['decoy_server' in name for name in topo.names], dtype=bool)
+    isTarget = np.array(['svrd' in name for name in topo.names], dtype=bool)
+    pro, missing = proceedProArrays(model, topo)
+
+    weight = np.zeros(samples)
+    length = np.zeros(samples)
+    decoy = np.zeros(samples)
+    target = np.zeros(samples)
+    proceed = np.zeros(samples)
+    for k in range(0, samples):
+        w, ids = model.samplePath(rand)
+        if ids is None:
+            continue
+        weight[k] = float(w)
+        length[k] = len(ids) - 3
+        decoy[k] = isDecoy[ids[-2]]
+        target[k] = isTarget[ids[-2]]
+        if target[k] and missing[ids].any():
+            raise missingProError()
+        proceed[k] = np.prod(pro[ids])
+
+    z = NormalDist().inv_cdf(0.5 + confidence/2.0)
+    estimates = {}
+    estimates["NP"] = sampleTotal(weight, z)
+    estimates["decoyPath"] = sampleTotal(weight*decoy, z)
+    estimates["MPL"] = sampleRatio(weight*length, weight, z)
+    estimates["decoyProceedPro"] = sampleRatio(weight*target*proceed, weight*target, z, 1.0)
+    return estimates
+
+def sampleTotal(values, z):
+    estimate = float(np.mean(values))
+    variance = float(np.var(values, ddof=1)/len(values)) if len(values) > 1 else float('inf')
+    half = z * math.sqrt(variance)
+    return estimate, variance, (estimate - half, estimate + half)
+
+def sampleRatio(numerator, denominator, z, empty=0.0):
+    total = float(np.sum(denominator))
+    if total == 0:
+        return empty, float('inf'), (-float('inf'), float('inf'))
+    estimate = float(np.sum(numerator))/total
+    #Delta method: the ratio varies like the residual total divided by the mean denominator
+    residual = numerator - estimate*denominator
+    variance = float(np.var(residual, ddof=1)/len(residual))/(total/len(denominator))**2 if len(residual) > 1 else float('inf')
+    half = z * math.sqrt(variance)
+    return estimate, variance, (estimate - half, estimate + half)
+
+def requiredSamples(estimate, samples, halfWidth, confidence=0.95):
+    """
+    @return: number of samples for a confidence interval of the given half width, from an estimate \
+             of estimatePathMetrics made with the given number of samples
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence/2.0)
+    variance = estimate[1] * samples
+    return int(math.ceil(variance * (z/halfWidth)**2))
 
 #====================================================================================
 #Compute the cost of solutions
@@ -141,10 +219,8 @@ def solutionCost(candidate_solution, info):
     Calculate the total cost of deployed solutions: connections
     """
     total_cost = info["riot_num"] * (info["diot_dimension"] + info["dserver_dimension"] + info["riot_num"] - 1)
-    solution_cost = 0.0
-    for i in range(0, total_cost):
-        if candidate_solution[i] != info["previous_solution"][i]: 
-            solution_cost += 1.0
+    changed = np.asarray(candidate_solution[:total_cost]) != np.asarray(info["previous_solution"][:total_cost])
+    solution_cost = float(np.count_nonzero(changed))
     
     return float(total_cost - solution_cost)
 
@@ -152,12 +228,10 @@ def solutionCost(candidate_solution, info):
 #Normalize metric values
 #====================================================================================
 def nomalizeMetrics(metric_list, normalized_range):
-    normalized_value_list = []
     min_value = normalized_range[0]
     max_value = normalized_range[1]
     #print("Before normalization", metric_list)
-    for i in metric_list:
-        temp = float(i - min_value)/float(max_value - min_value)
-        normalized_value_list.append(temp)
+    values = np.asarray(metric_list, dtype=float)
+    normalized_value_list = ((values - min_value)/float(max_value - min_value)).tolist()
     return normalized_value_list
     
\ No newline at end of file
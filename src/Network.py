@@ -4,12 +4,80 @@ This module contains network object and relevant functions.
 """
 
 from Node import *
+from bisect import bisect_right
+from contextlib import contextmanager
 import copy
+import numpy as np
+
+
+class topology(object):
+    """
+    Create integer-indexed view of a node list.
+    Connections are stored in CSR form: the successors of node i are
+    targets[offsets[i]:offsets[i+1]].
+    """
+    def __init__(self, nodes, byName=True):
+        #Map integer id to node and name
+        self.nodes = list(nodes)
+        self.names = [u.name for u in self.nodes]
+        #Map name to integer ids (names are not guaranteed to be unique)
+        self.index = {}
+        for i, name in enumerate(self.names):
+            self.index.setdefault(name, []).append(i)
+        self.pos = {id(u): i for i, u in enumerate(self.nodes)}
+        pos = self.pos
+
+        #Resolve connections either by name (as the attack graph does) or by identity
+        self.adj = []
+        for u in self.nodes:
+            succ = []
+            for v in u.con:
+                if byName:
+                    succ.extend(self.index.get(getattr(v, 'name', v), ()))
+                elif id(v) in pos:
+                    succ.append(pos[id(v)])
+            self.adj.append(succ)
+
+        counts = [len(succ) for succ in self.adj]
+        self.offsets = np.zeros(len(self.nodes)+1, dtype=np.int32)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.targets = np.fromiter((j for succ in self.adj for j in succ), dtype=np.int32, count=int(self.offsets[-1]))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def ids(self, name):
+        """
+        Return the integer ids of the nodes with the given name.
+        """
+        return self.index.get(name, [])
+
+    def idOf(self, u):
+        """
+        Return the integer id of the node object or None.
+        """
+        return self.pos.get(id(u))
+
+    def node(self, name):
+        """
+        Return the first node with the given name or None.
+        """
+        ids = self.index.get(name)
+        if ids:
+            return self.nodes[ids[0]]
+        return None
+
+    def successors(self, i):
+        return self.adj[i]
+
 
 class network(object):
     """
     Create network object.
     """
+    #Resolve connections by node name when building the topology
+    byName = True
+
     def __init__(self):
         #Initialize node list
         self.nodes = []
@@ -24,16 +92,243 @@ class network(object):
         self.max_depth = 0
         #Store the maximum hop
         self.max_hop = 0
+        #Bumped whenever connections of the nodes change (see touch and edgeChanged)
+        self.version = 0
+        #Cached integer-indexed topology and the state it was built for
+        self._topo = None
+        self._topoKey = None
+        #Cached successors sorted by privilege, with the topology they were built for
+        self._privIndex = None
+        #Cached name index (see nodeByName)
+        self._names = None
+        #Undo logs of the open edge transactions, innermost last (see begin)
+        self._undoLogs = []
+
+    def __getstate__(self):
+        #Do not copy or pickle the cached topology
+        state = self.__dict__.copy()
+        state['_topo'] = None
+        state['_topoKey'] = None
+        state['_privIndex'] = None
+        state['_names'] = None
+        #Open edge transactions stay with this network
+        state['_undoLogs'] = []
+        return state
+
+    def topology(self):
+        """
+        Return the CSR topology of start, end and nodes, rebuilt after connection changes.
+        The nodes of a rebuilt topology are owned by this network, so the connect/disconnect helpers
+        bump its version when they change their connections.
+        """
+        key = (self.version, len(self.nodes), id(self.s), id(self.e))
+        if getattr(self, '_topo', None) is None or self._topoKey != key:
+            self._topo = topology([u for u in [self.s, self.e] if u is not None] + self.nodes, self.byName)
+            self._topoKey = key
+            for u in self._topo.nodes:
+                u.owner = self
+        return self._topo
+
+    def touch(self):
+        """
+        Invalidate the cached topology after connections of the nodes were changed directly
+        (not by the connect/disconnect helpers), e.g. u.con.append(v).
+        """
+        self.version += 1
+        return None
+
+    def addNode(self, u):
+        """
+        Add a node to the network, owned by it from now on (see topology).
+        """
+        self.nodes.append(u)
+        u.owner = self
+        self.touch()
+        return None
+
+    def nodeByName(self, name):
+        """
+        Return the first node (start, end, then nodes) with the given name or None.
+        The name index only depends on the nodes, so it is not rebuilt when connections change.
+        """
+        key = (len(self.nodes), id(self.s), id(self.e))
+        if getattr(self, '_names', None) is None or self._names[0] != key:
+            index = {}
+            for u in [self.s, self.e] + self.nodes:
+                if u is not None:
+                    index.setdefault(u.name, u)
+            self._names = (key, index)
+        return self._names[1].get(name)
+
+    def privilegeIndex(self):
+        """
+        Return the successors of start, end and nodes by the privilege they require, rebuilt with the
+        topology. Successors without a privilege (e.g. start and end of a vulnerability network) are
+        left out, as they are never reachable in a lower layer.
+
+        :returns: list by topology id of (sorted distinct privileges, successor ids in connection order \
+                  which require at most each of these privileges)
+        """
+        topo = self.topology()
+        if getattr(self, '_privIndex', None) is None or self._privIndex[0] is not topo:
+            pos = topo.pos
+            index = []
+            for u in topo.nodes:
+                succ = [(v.privilege, pos[id(v)]) for v in u.con
+                        if getattr(v, 'privilege', None) is not None and id(v) in pos]
+                levels = sorted(set(p for p, j in succ))
+                index.append((levels, [[j for p, j in succ if p <= level] for level in levels]))
+            self._privIndex = (topo, index)
+        return self._privIndex[1]
+
+    def privilegeSuccessors(self, i, privilege):
+        """
+        Return the successors of node i which require at most the given privilege, in connection order.
+        They are precomputed for every privilege level, so lower layers for any privilege are cheap;
+        the returned list is shared and must not be changed.
+
+        :param i: topology id
+        :param privilege: privilege value of the attacker
+        :returns: list of topology ids
+        """
+        levels, succ = self.privilegeIndex()[i]
+        k = bisect_right(levels, privilege)
+        if k == 0:
+            return []
+        return succ[k-1]
+
+    #---------------------------------------------------------------------------------------------
+    #Edge transactions: change connections in place and revert them instead of copying the network
+
+    def begin(self):
+        """
+        Begin an edge transaction. Connection changes made by the connect/disconnect helpers to the nodes of
+        this network while it is open (e.g. by apply) are recorded in its undo log, so a candidate topology or
+        a what-if check can change the network in place and rollback instead of working on a copyNet copy.
+        Changes to other networks are not recorded. Transactions can be nested; only connection changes are
+        recorded, not node states. Prefer transaction, which always ends the transaction.
+        """
+        #Own the nodes, so their changes are recorded here, and keep the topology for rollback
+        self.topology()
+        self._undoLogs.append((self._topo, self._topoKey, []))
+        return None
+
+    @contextmanager
+    def transaction(self, keep=False):
+        """
+        Run a with block in an edge transaction which always ends: the changes are rolled back when the
+        block is left, or committed if keep is True and the block raised no exception.
+
+            with net.transaction():
+                net.apply(added, removed)
+                evaluate(net)
+
+        :param keep: commit the changes instead of rolling them back
+        :returns: context manager giving the network
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        if keep:
+            self.commit()
+        else:
+            self.rollback()
+
+    def apply(self, added=(), removed=()):
+        """
+        Add and remove connections in place (by connectOneWay and disconnectOneWay), removals first.
+
+        :param added: list of (node, node) pairs to connect
+        :param removed: list of (node, node) pairs to disconnect
+        :returns: None
+        """
+        for node1, node2 in removed:
+            disconnectOneWay(node1, node2)
+        for node1, node2 in added:
+            connectOneWay(node1, node2)
+        return None
+
+    def commit(self):
+        """
+        Keep the changes of the innermost transaction; an enclosing transaction can still roll them back.
+        """
+        topo, key, log = self.endTransaction()
+        if self._undoLogs:
+            self._undoLogs[-1][2].extend(log)
+        return None
+
+    def rollback(self):
+        """
+        Revert the changes of the innermost transaction, restoring the connection lists in their original order.
+        """
+        topo, key, log = self.endTransaction()
+        for con_list, index, node, added in reversed(log):
+            if added:
+                del con_list[index]
+            else:
+                con_list.insert(index, node)
+        if log:
+            #Every recorded change bumped the version once; if nothing else changed, the connections
+            #are as they were when the transaction began and so is its topology
+            restore = self.version == key[0] + len(log) and key[1:] == (len(self.nodes), id(self.s), id(self.e))
+            self.touch()
+            if restore:
+                self._topo = topo
+                self._topoKey = (self.version,) + key[1:]
+        return None
+
+    def endTransaction(self):
+        if not self._undoLogs:
+            raise ValueError("No open edge transaction on this network")
+        return self._undoLogs.pop()
+
+
+def recordChange(node1, index, node2, added):
+    """
+    Record connection node2 added at (or removed from) position index of node1.con in the open
+    transaction of the network owning node1.
+    """
+    net = node1.owner
+    if net is not None and net._undoLogs:
+        net._undoLogs[-1][2].append((node1.con, index, node2, added))
+
+
+def edgeChanged(node1):
+    """
+    Tell the network owning node1 that the connections of node1 were changed,
+    so its cached topology is rebuilt.
+    """
+    net = node1.owner
+    if net is not None:
+        net.version += 1
+    return None
 
 
 def copyNet(net):
     """
     Copy the network to a network.
+    Nodes are copied with their connections and states; vulnerability networks, names and ids are
+    shared instead of deep copied, as a vulnerability network is not changed once created (a node
+    gets a new one instead, see update_node).
     """
-    
-    temp = network()
-    temp = copy.deepcopy(net)
-    
+    temp = copy.copy(net)
+    nodes = [u for u in [net.s, net.e] if u is not None] + net.nodes
+    copies = {id(u): copy.copy(u) for u in nodes}
+    #Lists of nodes point to the copies (nodes outside the network stay shared)
+    for u in copies.values():
+        for name in u.listFields():
+            setattr(u, name, [copies.get(id(v), v) for v in getattr(u, name)])
+    temp.nodes = [copies[id(u)] for u in net.nodes]
+    temp.s = copies[id(net.s)] if net.s is not None else None
+    temp.e = copies[id(net.e)] if net.e is not None else None
+    #The copies belong to the new network
+    for u in copies.values():
+        u.owner = temp
+    temp.subnets = list(net.subnets)
+    temp.vuls = list(net.vuls)
     return temp
 
 
@@ -50,6 +345,7 @@ def constructSE(net):
             net.s.con.append(n)
         if n.isEnd:
             n.con.append(net.e)
+    net.touch()
 
           
 def connectOneWay(node1, node2):
@@ -60,8 +356,10 @@ def connectOneWay(node1, node2):
     if node1 is node2:
         return None
     #connect node1 to node2
-    if (node2 not in node1.con):
+    if node2 not in node1.con:
         node1.con.append(node2)    
+        recordChange(node1, len(node1.con)-1, node2, True)
+        edgeChanged(node1)
         #print(node1.name, node2.name)
 
 
@@ -73,20 +371,29 @@ def connectTwoWays(node1, node2):
     if node1 is node2:
         return None
     #create connections
-    if (node2 not in node1.con):
+    if node2 not in node1.con:
         node1.con.append(node2)
-    if (node1 not in node2.con):
+        recordChange(node1, len(node1.con)-1, node2, True)
+        edgeChanged(node1)
+    if node1 not in node2.con:
         node2.con.append(node1)
+        recordChange(node2, len(node2.con)-1, node1, True)
+        edgeChanged(node2)
     return None
 
 
-def removeNodeFromList(node, con_list):
+def removeNodeFromList(node, con_list, owner=None):
     """
     Remove node from the original connection list
+    Pass the node owning the list so that its network is told about the change.
     """
-    for i in con_list:
-        if i.name == node.name:
-            con_list.remove(i)
+    for i in range(len(con_list)):
+        if con_list[i].name == node.name:
+            removed = con_list[i]
+            del con_list[i]
+            if owner is not None:
+                recordChange(owner, i, removed, False)
+                edgeChanged(owner)
             break
     return None
 
@@ -95,10 +402,8 @@ def disconnectOneWay(node1, node2):
     """
     Disconnect node1 with node2 in the network
     """
-    names = [i.name for i in node1.con]
-    if node2.name in names:
-        #print(node2.name, names)
-        removeNodeFromList(node2, node1.con)
+    #Single pass over the connection list
+    removeNodeFromList(node2, node1.con, node1)
     return None
 
 
@@ -106,10 +411,12 @@ def disconnectTwoWays(node1, node2):
     """
     Disconnect node1 and node2 in the network.
     """
-    if node2 in node1.con:
-        node1.con.remove(node2)   
-    if node1 in node2.con:
-        node2.con.remove(node1)  
+    for u, v in [(node1, node2), (node2, node1)]:
+        if v in u.con:
+            i = u.con.index(v)
+            del u.con[i]
+            recordChange(u, i, v, False)
+            edgeChanged(u)
     return None
 
 
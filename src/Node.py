@@ -12,14 +12,19 @@ from math import *
 class node(object):
     """
     Create basic node object.
+    Node classes keep their fields in slots instead of a per-instance dictionary, which saves memory
+    in large networks and lower layers; a subclass declares the fields it adds.
     """
+    __slots__ = ('name', 'con', 'owner', 'isStart', 'isEnd', 'subnet', 'inPath', 'num', 'hop', 'current_hop')
+    #No lower layer; nodes which hold one declare the field (tNode, gVulNode) or build it lazily (gnode)
+    child = None
 
     def __init__(self, name):
         self.name = name
         # Set connections
         self.con = []
-        # Store lower layer info
-        self.child = None
+        # Network whose topology the node belongs to (set by network.topology), told about connection changes
+        self.owner = None
         # Set default value of start/end
         self.isStart = False
         self.isEnd = False
@@ -43,6 +48,14 @@ class node(object):
     def setEnd(self):
         self.isEnd = True
 
+    def listFields(self):
+        """
+        Return the names of the fields holding lists (connections, subnets, tree parents), which copies
+        of the node must not share (see copyNet).
+        """
+        return [name for cls in type(self).__mro__ for name in cls.__dict__.get('__slots__', ())
+                if type(getattr(self, name, None)) is list]
+
     # Check whether the node is leaf or not
     def isLeaf(self):
         return (len(self.con) is 1)
@@ -70,6 +83,7 @@ class device(node):
     """
     Create smart device object.
     """
+    __slots__ = ('vul', 'type', 'critical', 'comp', 'height', 'parent', 'comm', 'pro', 'prev_comp')
 
     def __init__(self, name):
         super(device, self).__init__(name)
@@ -90,6 +104,8 @@ class device(node):
 
 class realNode(node):
     # Create a real node in the network
+    __slots__ = ('vul', 'type', 'id', 'val', 'critical', 'comp', 'pro', 'prev_comp')
+
     def __init__(self, name):
         super(realNode, self).__init__(name)
         self.vul = None
@@ -111,6 +127,8 @@ class realNode(node):
 
 class decoyNode(node):
     # Create a decoy node in the network
+    __slots__ = ('vul', 'type', 'id', 'val', 'critical', 'comp', 'pro', 'prev_comp')
+
     def __init__(self, name):
         super(decoyNode, self).__init__(name)
         self.vul = None
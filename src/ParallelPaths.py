@@ -0,0 +1,148 @@
+"""
+This module enumerates and counts attack paths in parallel across a process pool.
+
+The attacker is connected to every entry point (see add_attacker), so the attack paths split
+into independent parts by their first hops. The parts are the path prefixes found by a
+depth-limited search; each worker extends or counts the paths of one prefix, and the results
+are merged in the order of the prefixes, which is the order of a serial traversal.
+"""
+
+import atexit
+import multiprocessing
+import os
+from array import array
+from PathCounting import *
+
+#Process pool reused by the parallel traversals, with its number of processes (see workerPool)
+sharedPool = None
+
+
+def workerPool(processes=None):
+    """
+    Return the process pool of this module, started on first use and again when another number of
+    processes is asked for, so repeated traversals do not pay for starting processes each time.
+    The workers get the topology with their tasks, so one pool serves any graph.
+    """
+    global sharedPool
+    if sharedPool is None or sharedPool[0] != processes:
+        closePool()
+        sharedPool = (processes, multiprocessing.Pool(processes=processes))
+    return sharedPool[1]
+
+
+@atexit.register
+def closePool():
+    global sharedPool
+    if sharedPool is not None:
+        sharedPool[1].terminate()
+        sharedPool[1].join()
+        sharedPool = None
+    return None
+
+
+def mapPrefixes(func, graph, prefixes, processes=None, chunks=4):
+    """
+    Apply func(graph, prefixes) to chunks of the prefixes in the worker pool, each chunk sent with
+    the graph, and return the results per prefix in the order of the prefixes.
+
+    :param chunks: number of chunks per process
+    """
+    n = chunks * (processes or os.cpu_count() or 1)
+    size = max(1, -(-len(prefixes) // n))
+    tasks = [(func, graph, prefixes[k:k+size]) for k in range(0, len(prefixes), size)]
+    return [r for part in workerPool(processes).map(runChunk, tasks) for r in part]
+
+
+def runChunk(task):
+    func, graph, prefixes = task
+    return func(graph, prefixes)
+
+
+#Paths are sent back as flat arrays, which pickle much faster than lists of lists
+def walkPrefixes(graph, prefixes):
+    adj, dist, budget, e = graph
+    parts = []
+    for prefix in prefixes:
+        flat = array('l')
+        lengths = array('l')
+        for ids in walkSimplePaths(adj, dist, budget, prefix, e):
+            flat.extend(ids)
+            lengths.append(len(ids))
+        parts.append((flat, lengths))
+    return parts
+
+
+def countPrefixes(graph, prefixes):
+    adj, ok, weight = graph
+    counts = []
+    k = 0
+    while k < len(prefixes):
+        #Prefixes which only differ in their last node share one count (and its memoized states)
+        head = prefixes[k][:-1]
+        group = [prefixes[k][-1]]
+        k += 1
+        while k < len(prefixes) and prefixes[k][:-1] == head:
+            group.append(prefixes[k][-1])
+            k += 1
+        #Paths may not return to the prefix
+        sub = ok[:]
+        for v in head:
+            sub[v] = False
+        #Only the part of the graph reachable from the ends of the prefixes is counted
+        count = countSimplePaths(adj, sub, weight, group)
+        counts.extend(count[v] for v in group)
+    return counts
+
+
+def pathPrefixes(adj, dist, budget, s, e, depth):
+    """
+    :returns: list of path prefixes with depth nodes (and complete paths to e which are shorter)
+    """
+    return list(walkSimplePaths(adj, dist, budget, [s], e, None, depth))
+
+
+def enumeratePathsParallel(adj, dist, budget, s, e, processes=None, depth=3):
+    """
+    Enumerate simple paths from s to e in parallel.
+
+    :param adj: successor lists by node id
+    :param dist: number of connections from each node to e, used with the budget
+    :param budget: maximum number of connections on a path, or None for no bound
+    :param processes: number of worker processes (all processors if None)
+    :param depth: number of nodes in the prefixes which partition the paths; 3 splits \
+                  attack paths by entry point (start, attacker, entry point)
+    :returns: list of paths as lists of node ids, in traversal order
+    """
+    prefixes = pathPrefixes(adj, dist, budget, s, e, depth)
+    parts = mapPrefixes(walkPrefixes, (adj, dist, budget, e), prefixes, processes)
+
+    paths = []
+    for flat, lengths in parts:
+        k = 0
+        for l in lengths:
+            paths.append(flat[k:k+l].tolist())
+            k += l
+    return paths
+
+
+def countPathsParallel(adj, ok, weight, s, processes=None, depth=3):
+    """
+    Count weighted simple paths from s in parallel (see countSimplePaths).
+
+    :returns: weighted number of simple paths from s
+    """
+    #Expand the prefixes level by level, counting the paths which stop on the way
+    total = 0
+    prefixes = [[s]]
+    for d in range(1, depth):
+        longer = []
+        for prefix in prefixes:
+            total += weight[prefix[-1]]
+            for v in adj[prefix[-1]]:
+                if ok[v] and v not in prefix:
+                    longer.append(prefix + [v])
+        prefixes = longer
+    if not prefixes:
+        return total
+
+    return total + sum(mapPrefixes(countPrefixes, (adj, ok, weight), prefixes, processes, 1))
@@ -0,0 +1,234 @@
+"""
+This module counts simple paths on integer-indexed topologies without enumerating them.
+
+Nodes are integer ids and connections are successor lists (see topology in Network.py).
+Paths are counted by dynamic programming over the condensation of the graph into strongly
+connected components: a simple path never returns to a component once it has left it, so the
+count is exact on the acyclic parts, and inside a cyclic component the simple paths are walked
+by depth-first search memoized on (node, visited nodes of the component).
+The number of such states grows exponentially with the size of a cyclic component (up to n*2^n
+for n nodes), so counting fails with a ValueError once a component needs more than
+maxComponentStates of them; bound the path length instead (see ag.maxLength).
+Where the paths themselves are needed, walkSimplePaths enumerates them with an explicit stack.
+"""
+
+#Maximum number of memoized (node, visited nodes) states inside one strongly connected component
+#(about 140 bytes each, so about 1.4 GB)
+maxComponentStates = 10000000
+
+
+def stronglyConnected(adj, ok, roots=None):
+    """
+    Compute strongly connected components with an iterative Tarjan's algorithm.
+
+    :param adj: successor lists by node id
+    :param ok: list of flags; connections into nodes which are not ok are ignored
+    :param roots: node ids to search from, or None for all nodes; only the components reachable \
+                  from them are returned
+    :returns: list of components (lists of node ids), successors first (reverse topological order)
+    """
+    n = len(adj)
+    index = [None] * n
+    low = [0] * n
+    onStack = [False] * n
+    stack = []
+    comps = []
+    counter = 0
+
+    for root in (range(0, n) if roots is None else roots):
+        if index[root] is not None:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        onStack[root] = True
+        work = [[root, 0]]
+        while work:
+            frame = work[-1]
+            v = frame[0]
+            if frame[1] < len(adj[v]):
+                w = adj[v][frame[1]]
+                frame[1] += 1
+                if not ok[w]:
+                    continue
+                if index[w] is None:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onStack[w] = True
+                    work.append([w, 0])
+                elif onStack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == index[v]:
+                    comp = []
+                    while True:
+                        w = stack.pop()
+                        onStack[w] = False
+                        comp.append(w)
+                        if w == v:
+                            break
+                    comps.append(comp)
+
+    return comps
+
+
+def countSimplePaths(adj, ok, weight, roots=None):
+    """
+    Count weighted simple paths starting from every node.
+    A path may stop at any node and contributes the weight of its last node, so giving the
+    nodes before the target their number of connections to the target counts the paths to it.
+
+    :param adj: successor lists by node id (repeated successors count as separate paths)
+    :param ok: list of flags; paths only enter nodes which are ok (any node may start a path)
+    :param weight: list of integer weights by node id
+    :param roots: node ids, or None for all nodes; if given, only the nodes reachable from them \
+                  are counted (the others are 0)
+    :returns: list with the weighted number of simple paths from each node
+    """
+    comps = stronglyConnected(adj, ok, roots)
+    compOf = [0] * len(adj)
+    for c in range(0, len(comps)):
+        for v in comps[c]:
+            compOf[v] = c
+
+    #Nodes whose count is needed: the roots and the nodes paths from them enter a component by
+    #(components are walked predecessors first; every node of a reached component is on some path)
+    needed = None
+    if roots is not None:
+        needed = [False] * len(adj)
+        for v in roots:
+            needed[v] = True
+        for c in range(len(comps)-1, -1, -1):
+            if any(needed[v] for v in comps[c]):
+                for v in comps[c]:
+                    for u in adj[v]:
+                        if ok[u] and compOf[u] != c:
+                            needed[u] = True
+
+    count = [0] * len(adj)
+    #Components are processed successors first, so paths leaving a component are already counted
+    for c in range(0, len(comps)):
+        comp = comps[c]
+        if needed is not None and not any(needed[v] for v in comp):
+            continue
+        base = {}
+        for v in comp:
+            val = weight[v]
+            for u in adj[v]:
+                if ok[u] and compOf[u] != c:
+                    val += count[u]
+            base[v] = val
+
+        if len(comp) == 1:
+            count[comp[0]] = base[comp[0]]
+        else:
+            bit = {}
+            for i in range(0, len(comp)):
+                bit[comp[i]] = 1 << i
+            inner = {}
+            indegree = dict.fromkeys(comp, 0)
+            for v in comp:
+                inner[v] = [u for u in adj[v] if ok[u] and compOf[u] == c]
+                for u in inner[v]:
+                    indegree[u] += 1
+            #A state of a node with a single connection into it is only reached from one state of its
+            #predecessor, so only states of nodes with several are memoized
+            shared = {v: indegree[v] > 1 for v in comp}
+            memo = {}
+            for v in comp:
+                if needed is None or needed[v]:
+                    count[v] = walkComponent(v, bit[v], base, inner, bit, shared, memo)
+
+    return count
+
+
+def walkComponent(v, mask, base, inner, bit, shared, memo):
+    """
+    Count weighted simple paths from v inside a strongly connected component, by depth-first search
+    with an explicit stack (as walkSimplePaths), so long paths do not hit the recursion limit.
+
+    :param mask: bitmask of component nodes already on the path
+    :param shared: flags by node id; states (node, mask) of flagged nodes are memoized
+    :param memo: weighted number of paths by state, shared by the calls for one component
+    :returns: weighted number of paths, including those leaving the component
+    """
+    if (v, mask) in memo:
+        return memo[(v, mask)]
+    #Frames of node, mask, paths counted so far and position in its successors
+    stack = [[v, mask, base[v], 0]]
+    while True:
+        frame = stack[-1]
+        succ = inner[frame[0]]
+        if frame[3] < len(succ):
+            u = succ[frame[3]]
+            frame[3] += 1
+            if frame[1] & bit[u]:
+                continue
+            m = frame[1] | bit[u]
+            if shared[u] and (u, m) in memo:
+                frame[2] += memo[(u, m)]
+            else:
+                stack.append([u, m, base[u], 0])
+            continue
+        stack.pop()
+        u, m, val = frame[0], frame[1], frame[2]
+        if shared[u]:
+            memo[(u, m)] = val
+            if len(memo) > maxComponentStates:
+                raise ValueError("Too many simple paths to count in a strongly connected component of %d nodes; "
+                                 "bound the attack path length instead" % len(bit))
+        if not stack:
+            return val
+        stack[-1][2] += val
+
+
+def walkSimplePaths(adj, dist, budget, prefix, e, rand=None, depth=None):
+    """
+    Enumerate simple paths to e which extend a given prefix, by depth-first search with an explicit
+    stack. Visited nodes are kept in a bitmask (Python int).
+
+    :param adj: successor lists by node id
+    :param dist: number of connections from each node to e, used with the budget
+    :param budget: maximum number of connections on a path, or None for no bound
+    :param prefix: list of node ids the paths start with
+    :param rand: random number generator; if given, successors are visited in random order
+    :param depth: if given, stop at this number of nodes and also generate the unfinished paths
+    :returns: generator of paths as lists of node ids, in traversal order
+    """
+    if prefix[-1] == e:
+        yield prefix[:]
+        return
+    visited = 0
+    for v in prefix:
+        visited |= 1 << v
+    path = prefix[:]
+    #Successors still to visit for each node after the prefix, reversed for popping from the end
+    todo = [orderSuccessors(adj[path[-1]], rand)]
+    while todo:
+        if not todo[-1]:
+            visited &= ~(1 << path.pop())
+            todo.pop()
+            continue
+        v = todo[-1].pop()
+        if (visited >> v) & 1:
+            continue
+        #Prune branches which cannot reach e within the remaining budget
+        if budget is not None and len(path) + dist[v] > budget:
+            continue
+        if v == e or len(path) + 1 == depth:
+            yield path + [v]
+        else:
+            path.append(v)
+            todo.append(orderSuccessors(adj[v], rand))
+            visited |= 1 << v
+
+
+def orderSuccessors(succ, rand):
+    succ = succ[::-1]
+    if rand is not None:
+        rand.shuffle(succ)
+    return succ
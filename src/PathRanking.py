@@ -0,0 +1,96 @@
+"""
+This module ranks simple paths on integer-indexed topologies by node weights.
+
+Nodes are integer ids and connections are successor lists (see topology in Network.py).
+The k best paths are found with Yen's algorithm: each next path deviates from an already
+found path at some node (the spur node) and continues along a shortest path which avoids
+the earlier part of that path and the connections already used to leave the spur node.
+"""
+
+import heapq
+
+
+def shortestPath(adj, weight, s, e, blockedNodes=set(), blockedEdges=set()):
+    """
+    Find the path with the smallest total node weight by Dijkstra's algorithm.
+
+    :param adj: successor lists by node id
+    :param weight: list of non-negative weights by node id, paid when a node is entered
+    :param blockedNodes: set of node ids which may not be entered
+    :param blockedEdges: set of connections (pairs of node ids) which may not be used
+    :returns: total weight and path as a list of node ids, or (None, None) if e cannot be reached
+    """
+    dist = {s: 0.0}
+    prev = {s: None}
+    done = set()
+    heap = [(0.0, s)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u == e:
+            path = []
+            while u is not None:
+                path.append(u)
+                u = prev[u]
+            path.reverse()
+            return d, path
+        for v in adj[u]:
+            if v in done or v in blockedNodes or (u, v) in blockedEdges:
+                continue
+            dv = d + weight[v]
+            if v not in dist or dv < dist[v]:
+                dist[v] = dv
+                prev[v] = u
+                heapq.heappush(heap, (dv, v))
+    return None, None
+
+
+def kShortestPaths(adj, weight, s, e, k):
+    """
+    Find the k simple paths with the smallest total node weight by Yen's algorithm.
+    Ties are broken by the node ids along the path, so the result is deterministic.
+
+    :param adj: successor lists by node id
+    :param weight: list of non-negative weights by node id, paid when a node is entered
+    :param k: maximum number of paths
+    :returns: list of (total weight, path as a list of node ids), best first
+    """
+    found = []
+    if k <= 0:
+        return found
+    d, path = shortestPath(adj, weight, s, e)
+    if path is None:
+        return found
+    found.append((d, path))
+    #Candidate paths as (total weight, tuple of node ids)
+    candidates = []
+    seen = set([tuple(path)])
+
+    while len(found) < k:
+        last = found[-1][1]
+        rootCost = 0.0
+        for i in range(0, len(last)-1):
+            spur = last[i]
+            root = last[:i+1]
+            if i > 0:
+                rootCost += weight[spur]
+            #Do not leave the spur node the way an already found path with the same root does
+            blockedEdges = set()
+            for c, p in found:
+                if len(p) > i+1 and p[:i+1] == root:
+                    blockedEdges.add((p[i], p[i+1]))
+            spurCost, spurPath = shortestPath(adj, weight, spur, e, set(root[:-1]), blockedEdges)
+            if spurPath is None:
+                continue
+            total = tuple(root[:-1] + spurPath)
+            if total not in seen:
+                seen.add(total)
+                heapq.heappush(candidates, (rootCost + spurCost, total))
+        if not candidates:
+            break
+        c, p = heapq.heappop(candidates)
+        found.append((c, list(p)))
+
+    return found
@@ -0,0 +1,135 @@
+"""
+This module stores attack paths compactly as a prefix trie.
+
+Attack paths share long prefixes (start point, attacker, first IoT hop), so each path is kept as
+a leaf entry with parent pointers instead of a full list copy. The store behaves like a read-only
+list of paths and can be exported to ragged arrays.
+"""
+
+from array import array
+import numpy as np
+
+
+class pathStore(object):
+    """
+    Create prefix trie of attack paths.
+    Entry i holds the topology id node[i] and its parent entry parent[i] (-1 for a root);
+    each path is identified by the entry of its last node.
+    """
+    def __init__(self, nodes):
+        #Map topology id to graph node
+        self.nodes = nodes
+        self.parent = array('l')
+        self.node = array('l')
+        self.depth = array('l')
+        #Last entry of each path
+        self.leaves = array('l')
+        #Entries of the previously added path
+        self.last = []
+        #Cached ragged export
+        self.ragged = None
+
+    def add(self, ids):
+        """
+        Add a path given as a list of topology ids.
+        Paths are expected in traversal (depth-first) order, so a path shares its prefix with the previous one.
+        """
+        last = self.last
+        k = 0
+        while k < len(last) and k < len(ids) and self.node[last[k]] == ids[k]:
+            k += 1
+        del last[k:]
+
+        parent = -1
+        if last:
+            parent = last[-1]
+        for v in ids[k:]:
+            entry = len(self.node)
+            self.node.append(v)
+            self.parent.append(parent)
+            self.depth.append(len(last)+1)
+            last.append(entry)
+            parent = entry
+        self.leaves.append(last[-1])
+        self.ragged = None
+
+    def extend(self, idPaths):
+        for ids in idPaths:
+            self.add(ids)
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def view(self, nodes):
+        """
+        Return a store sharing the paths of this one, mapping topology ids to other graph nodes
+        (e.g. the nodes of a cloned attack graph). The paths must not be added to afterwards.
+        """
+        store = pathStore(nodes)
+        store.parent = self.parent
+        store.node = self.node
+        store.depth = self.depth
+        store.leaves = self.leaves
+        store.ragged = self.ragged
+        return store
+
+    def pathIds(self, i):
+        """
+        Return path i as a list of topology ids.
+        """
+        ids = []
+        entry = self.leaves[i]
+        while entry >= 0:
+            ids.append(self.node[entry])
+            entry = self.parent[entry]
+        ids.reverse()
+        return ids
+
+    def __getitem__(self, i):
+        return [self.nodes[v] for v in self.pathIds(i)]
+
+    def __iter__(self):
+        for i in range(0, len(self.leaves)):
+            yield self[i]
+
+    def nodesFromEnd(self, k):
+        """
+        Return the node k positions before the last node of each path (None for shorter paths).
+        """
+        nodes = []
+        for entry in self.leaves:
+            for i in range(0, k):
+                if entry >= 0:
+                    entry = self.parent[entry]
+            if entry >= 0:
+                nodes.append(self.nodes[self.node[entry]])
+            else:
+                nodes.append(None)
+        return nodes
+
+    def toRagged(self):
+        """
+        Export the paths as ragged arrays.
+
+        :returns: flat int32 array of topology ids and int64 offsets; path i is flat[offsets[i]:offsets[i+1]]
+        """
+        if self.ragged is not None:
+            return self.ragged
+        node = np.array(self.node, dtype=np.int64)
+        parent = np.array(self.parent, dtype=np.int64)
+        depth = np.array(self.depth, dtype=np.int64)
+        cur = np.array(self.leaves, dtype=np.int64)
+
+        offsets = np.zeros(len(cur)+1, dtype=np.int64)
+        np.cumsum(depth[cur], out=offsets[1:])
+        flat = np.empty(int(offsets[-1]), dtype=np.int32)
+        #Fill all paths from their last node backwards, one level at a time
+        pos = offsets[1:] - 1
+        alive = np.nonzero(cur >= 0)[0]
+        while len(alive):
+            flat[pos[alive]] = node[cur[alive]]
+            cur[alive] = parent[cur[alive]]
+            pos[alive] -= 1
+            alive = alive[cur[alive] >= 0]
+        self.ragged = (flat, offsets)
+        return self.ragged
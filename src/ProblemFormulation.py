@@ -36,6 +36,8 @@ class problem(object):
         self.real_bounder = None
         self.decoy_list = None
         self.sim_num = None
+        #Network and HARM of the union of all solutions (see solution_union)
+        self.union = None
         
     def generator(self, random, args):
         """The generator function for the problem."""
@@ -92,14 +94,15 @@ class problemBinary(problem):
     def evaluator(self, candidates, args):
         
         fitness = []
+        #Candidates share the possible connections, so build the HARM of their union once and mask it
+        #Rebuild it when the decoy network is replaced or its connections change (new topology version)
+        topo = self.decoy_net.topology()
+        if self.union is None or self.union[0] is not self.decoy_net or self.union[1] is not topo:
+            self.union = (self.decoy_net, topo, solution_union(self.decoy_net, self.info, self.decoy_list))
         for c_binary in candidates:
             #print("binary solution:", c_binary)
             #net = add_solution(self.decoy_net, c_binary, self.info, self.decoy_list)
-            net = add_solution_real_decoy(self.decoy_net, c_binary, self.info, self.decoy_list)
-            newnet = add_attacker(net)
-            #print("Add attacker:")
-            #printNet(newnet)
-            harm = constructHARM(newnet)
+            harm = solution_harm(self.union[2], c_binary, self.info)
 
             f1 = decoyPath(harm) 
             f2 = float(sum([computeMTTSF(harm, self.net, self.info["threshold"]) for i in range(0, self.sim_num)])/self.sim_num)
@@ -15,6 +15,7 @@ from Metrics import *
 from itertools import accumulate
 import random
 from collections import OrderedDict
+import numpy as np
 
 #=================================================================================================
 # Create real network 
@@ -238,7 +239,9 @@ def add_attacker(net):
     #Add attacker
     A = device('attacker')    
     A.setStart()
-    for temp in net.nodes:
+    targets = list(net.nodes)
+    net.addNode(A)
+    for temp in targets:
         
         #Set the real and decoy servers as targets
         if "server" in temp.name:
@@ -246,20 +249,25 @@ def add_attacker(net):
             temp.setEnd()
         else:
             #print("others", temp.name)
-            A.con.append(temp)
-    
-    net.nodes.append(A)
+            connectOneWay(A, temp)
     
     constructSE(net)
 
     return net
 
-def constructHARM(net):
+def constructHARM(net, maxLength=None, topK=None, processes=None):
     #Create security model
     h = harm()
     
     #printNet(net)
-    h.constructHarm(net, "attackgraph", 1, "attacktree", 1, 1)
+    #Repeated topologies reuse the HARM built for them
+    h.constructHarm(net, "attackgraph", 1, "attacktree", 1, 1, harms)
+    #Only enumerate attack paths up to the maximum length (unbounded if None)
+    h.model.maxLength = maxLength
+    #Only keep the k most likely attack paths (all paths if None)
+    h.model.topK = topK
+    #Enumerate and count attack paths in parallel by entry point (serially if None)
+    h.model.processes = processes
     h.system_risk = system_risk(net)
     #h.model.printAG()
     #h.model.printPath()
@@ -1173,6 +1181,30 @@ def add_solution(net, candidate_solution, info, decoy_list):
 
     return newNet
 
+def solution_pairs(info):
+    """
+    Map the solution bits to the connections they change, in the order add_solution_real_decoy changes them:
+    - from real IoT nodes to decoys
+    - from real IoT nodes to real IoT nodes
+    
+    :param info: information of the deployment (dimensions, number of real IoT nodes)
+    :returns: list of (bit index, id of the real IoT node, decoy index or None, id of the connected real IoT node or None)
+    """
+    pairs = []
+    for i in range(0, info["diot_dimension"]+info["dserver_dimension"]):    
+        num = i * info["riot_num"]
+        for j in range(1, info["riot_num"]+1):
+            pairs.append((num+j-1, j, i, None))
+    
+    solution1 = (info["diot_dimension"]+info["dserver_dimension"]) * info["riot_num"]
+    id_list = range(1, info["riot_num"]+1)
+    for i in range(0, info["riot_num"]):
+        num = i * (info["riot_num"]-1)
+        temp_list = [k for k in id_list if k != (i+1)]
+        for j in range(0, info["riot_num"]-1): #index of the id_list
+            pairs.append((solution1+num+j-1, i+1, None, temp_list[j]))
+    return pairs
+
 def add_solution_real_decoy(net, candidate_solution, info, decoy_list):
     """
     Interpret solution to add connections.
@@ -1187,52 +1219,80 @@ def add_solution_real_decoy(net, candidate_solution, info, decoy_list):
         if node1.name in decoy_list:
             temp[decoy_list.index(node1.name)] = node1
 
-    #Add or remove connections from real IoT nodes to decoys
-    for i in range(0, info["diot_dimension"]+info["dserver_dimension"]):    
-        num = i * info["riot_num"]
-        dnode = temp[i]
-        #print(dnode.name)
-        for j in range(1, info["riot_num"]+1):
-            #print(candidate_solution[num+j-1])
-            if candidate_solution[num+j-1] == 1 and info["previous_solution"][num+j-1] == 0:
-                for node2 in newNet.nodes:
-                    if node2.id == j:
-                        #print("Add connection: ", node2.name, dnode.name)
-                        connectOneWay(node2, dnode)
-            elif candidate_solution[num+j-1] == 0 and info["previous_solution"][num+j-1] == 1:
-                for node2 in newNet.nodes:
-                    if node2.id == j:
-                        #print("Remove connection: ", node2.name, dnode.name)
-                        disconnectOneWay(node2, dnode)
-    
-    solution1 = (info["diot_dimension"]+info["dserver_dimension"]) * info["riot_num"]
-    id_list = range(1, info["riot_num"]+1)
-    #Add or remove connections from real IoT nodes to real IoT nodes
-    for i in range(0, info["riot_num"]):
-        num = i * (info["riot_num"]-1)
-        for j in range(0, info["riot_num"]-1): #index of the id_list
-            if candidate_solution[solution1+num+j-1] == 1 and info["previous_solution"][solution1+num+j-1] == 0:
-                for node3 in newNet.nodes:
-                    for node4 in newNet.nodes:
-                        temp_list = []
-                        for k in id_list:    
-                            if k != (i+1):
-                                temp_list.append(k) 
-                        if node3.id == (i+1) and node4.id == temp_list[j]:
-                            #print("Add connection: ", node3.name, node4.name)
-                            connectOneWay(node3, node4)
-            elif candidate_solution[solution1+num+j-1] == 0 and info["previous_solution"][solution1+num+j-1] == 1:
-                for node3 in newNet.nodes:
-                    for node4 in newNet.nodes:
-                        temp_list = []
-                        for k in id_list:    
-                            if k != (i+1):
-                                temp_list.append(k) 
-                        if node3.id == (i+1) and node4.id == temp_list[j]:
-                            #print("Remove connection: ", node3.name, node4.name)
-                            disconnectOneWay(node3, node4)              
+    for k, source, decoy, target in solution_pairs(info):
+        if candidate_solution[k] == 1 and info["previous_solution"][k] == 0:
+            change = connectOneWay
+        elif candidate_solution[k] == 0 and info["previous_solution"][k] == 1:
+            change = disconnectOneWay
+        else:
+            continue
+        #Add or remove connections from real IoT nodes to decoys
+        if decoy is not None:
+            for node2 in newNet.nodes:
+                if node2.id == source:
+                    change(node2, temp[decoy])
+        #Add or remove connections from real IoT nodes to real IoT nodes
+        else:
+            for node3 in newNet.nodes:
+                for node4 in newNet.nodes:
+                    if node3.id == source and node4.id == target:
+                        change(node3, node4)
     
     #print("Connection changes:")
     #printNetWithVul(newNet)
 
-    return newNet
\ No newline at end of file
+    return newNet
+
+def solution_union(net, info, decoy_list):
+    """
+    Build the HARM of the union of all solutions (the network with every connection a solution can add) once,
+    so that candidates are evaluated as masks over its connections (see solution_harm) instead of copying the
+    network and rebuilding the HARM for each of them.
+    
+    :returns: union HARM and the solution bits as (bit index, whether net has the connection, connection ids \
+              in the union attack graph) 
+    """
+    ones = [1] * len(info["previous_solution"])
+    h = constructHARM(add_attacker(add_solution_real_decoy(net, ones, info, decoy_list)))
+    topo = h.model.topology()
+    #Connection ids of the union attack graph by the names of the connected network nodes
+    edges = {}
+    for i in range(0, len(topo)):
+        for p in range(topo.offsets[i], topo.offsets[i+1]):
+            edges.setdefault((topo.nodes[i].n.name, topo.nodes[topo.targets[p]].n.name), []).append(p)
+    
+    bits = []
+    for k, source, decoy, target in solution_pairs(info):
+        if decoy is not None:
+            name = getattr(decoy_list[decoy], 'name', decoy_list[decoy])
+            targets = [u for u in net.nodes if u.name == name]
+        else:
+            targets = [u for u in net.nodes if u.id == target]
+        for u in net.nodes:
+            if u.id == source:
+                for v in targets:
+                    has = v.name in [w.name for w in u.con]
+                    bits.append((k, has, edges.get((u.name, v.name), [])))
+    return h, bits
+
+def solution_harm(union, candidate_solution, info):
+    """
+    Create the HARM of a solution from the union HARM by masking the connections the solution does not have
+    (see solution_union). It equals the HARM of add_solution_real_decoy with the attacker added.
+    
+    :param union: union HARM and solution bits returned by solution_union
+    :returns: harm object
+    """
+    h, bits = union
+    keep = np.ones(len(h.model.topology().targets), dtype=bool)
+    previous = info["previous_solution"]
+    for k, has, ids in bits:
+        if candidate_solution[k] == 1 and previous[k] == 0:
+            continue
+        if (candidate_solution[k] == 0 and previous[k] == 1) or not has:
+            keep[ids] = False
+    masked = harm()
+    masked.model = h.model.maskEdges(keep)
+    #The system risk only depends on the nodes, which the union and all solutions share
+    masked.system_risk = h.system_risk
+    return masked
\ No newline at end of file
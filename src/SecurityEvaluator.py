@@ -12,6 +12,7 @@ import subprocess
 import os
 import re
 import math
+import random
 from random import shuffle, uniform, expovariate
 import numpy as np
 import harm
@@ -26,7 +27,7 @@ import harm
 #   only ADN or OR, which means the attacker need to use all vulnerabilities or any one of them
 #---------------------------------------------------------------------------------------------------
 
-def computeNodeMTTC(node):
+def computeNodeMTTC(node, val):
     count = 0
     MTTC = 0
     flag = False
@@ -36,7 +37,7 @@ def computeNodeMTTC(node):
         count += 1
         if node.critical == True:
             flag = True
-        MTTC = 1.0/node.val
+        MTTC = 1.0/val
     else:
         #node.comp = True
         #Introduce error range for decoy node
@@ -44,8 +45,8 @@ def computeNodeMTTC(node):
         pro = node.pro + error_value
         if pro > 1.0:
             pro = 1.0 
-        MTTC = (1.0/node.val) * pro
-    #print(node.name, node.type, node.val, MTTC, flag)
+        MTTC = (1.0/val) * pro
+    #print(node.name, node.type, val, MTTC, flag)
     return MTTC, count, flag
 
 #---------------------------------------------------------------------------------------------------
@@ -60,20 +61,22 @@ def computeMTTSF(harm, net, cflag):
     """
     totalNo = len(net.nodes)
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
-    shuffle(harm.model.allpath) #Attacker randomly picks one entry point at a time
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
+    #Attacker randomly picks one entry point at a time
     #harm.model.printPath()
     #print("number of attack paths:", len(harm.model.allpath))
     MTTSF = 0
     break_flag = False
     
     totalCount = 0
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths(random):
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
-                    MTTC, count, flag = computeNodeMTTC(node) 
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
+                    MTTC, count, flag = computeNodeMTTC(node, val) 
                     MTTSF += MTTC
                     if node.type == True:
                         totalCount += count
@@ -93,52 +96,61 @@ def computeMTTSF(harm, net, cflag):
 #Compute MTTSF in shuffling
 #----------------------------------------------------------------------------------------------------
 
-def computeCompNodes(node, detect_pro):
+def computeCompNodes(node, val, detect_pro):
     """
     Simulate attacker's behavior.
     Generate the compromised nodes
     """
     flag = False #SF2
     detect_pro = 1.0 #Reflect real compromised nodes by the attacker
-    #print("Compromised node: ", node.name, node.type, node.val)
+    #print("Compromised node: ", node.name, node.type, val)
     #Critical node can be always detected
     if node.type == True:
         node.comp = True
         if node.critical == True:
             flag = True
-        MTTC = (1.0/node.val) * node.pro - node.prev_comp
+        MTTC = (1.0/val) * node.pro - node.prev_comp
     else:
         #node.comp = True
         #Introduce error range for decoy node
         error_value = uniform(-0.05, 0.05)
         pro = node.pro + error_value
-        MTTC = (1.0/node.val) * pro * detect_pro
+        MTTC = (1.0/val) * pro * detect_pro
     #print("MTTC: ", MTTC)  
     return MTTC, flag 
 
 def checkNeighbors(compNodes, neighbor_list):
     compNo = 0
+    #Count how many times each neighbor appears in the list
+    neighbor_count = {}
+    for neighbor in neighbor_list:
+        neighbor_count["ag_"+neighbor.name] = neighbor_count.get("ag_"+neighbor.name, 0) + 1
     for node in compNodes:
-        for neighbor in neighbor_list:
-            if node.name == "ag_"+neighbor.name:
-                compNo += 1
+        compNo += neighbor_count.get(node.name, 0)
     #print("Number of compromised neighbors: ", compNo)
     return compNo
 
+def getNetNodes(net, attack_node):
+    """
+    Return the nodes in the network represented by the attack graph node.
+    """
+    if not attack_node.name.startswith("ag_"):
+        return []
+    topo = net.topology()
+    return [topo.nodes[i] for i in topo.ids(attack_node.name[3:]) if topo.nodes[i] is not net.s and topo.nodes[i] is not net.e]
+
 def assignCompNodeInNet(decoy_net, attack_node):
-    for node in decoy_net.nodes:
-        if attack_node.name == "ag_"+node.name:
-            #print("Assign compromised node in original net: ", node.name, attack_node.name)
-            node.comp = True
+    for node in getNetNodes(decoy_net, attack_node):
+        #print("Assign compromised node in original net: ", node.name, attack_node.name)
+        node.comp = True
     return None
 
 def modifyCompNodeInNet(decoy_net, attack_node, left_time):
     
-    for node in decoy_net.nodes:
-        if attack_node.name == "ag_"+node.name:
-            #print("Assign compromised node in original net: ", node.name, attack_node.name)
-            
-            node.prev_comp = node.prev_comp + left_time
+    for node in getNetNodes(decoy_net, attack_node):
+        #print("Assign compromised node in original net: ", node.name, attack_node.name)
+        
+        node.prev_comp = node.prev_comp + left_time
     return None
 
 def computeIDSRateSSL(detect_pro, compNodes, totalNo, compNeighborNo, neighborNo):
@@ -168,9 +180,10 @@ def computeSSL_Interval(harm, net, decoy_net, thre_check, cflag, detect_pro, w1,
     
     totalNo = len(net.nodes)
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
-    shuffle(harm.model.allpath)  
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
+    #Attacker randomly picks one entry point at a time
     #harm.model.printPath()
     #print("number of attack paths:",)) 
 
@@ -179,12 +192,13 @@ def computeSSL_Interval(harm, net, decoy_net, thre_check, cflag, detect_pro, w1,
     neighborNo = len(neighbor_list)
     #print("Neighbor list: ", [i.name for i in neighbor_list])
     break_flag = False
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths(random):
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
                     #Simulate attacker's behavior
-                    MTTC, flag = computeCompNodes(node, detect_pro) 
+                    MTTC, flag = computeCompNodes(node, val, detect_pro) 
                     if node.type == True:
                         compNodes.append(node)
                         assignCompNodeInNet(decoy_net, node)
@@ -222,9 +236,10 @@ def computeSSL_FixedInterval(harm, net, decoy_net, thre_check, cflag, detect_pro
     
     totalNo = len(net.nodes)
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
-    shuffle(harm.model.allpath)  
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
+    #Attacker randomly picks one entry point at a time
     #harm.model.printPath()
     #print("number of attack paths:",)) 
     
@@ -235,12 +250,13 @@ def computeSSL_FixedInterval(harm, net, decoy_net, thre_check, cflag, detect_pro
     neighborNo = len(neighbor_list)
     #print("Neighbor list: ", [i.name for i in neighbor_list])
     break_flag = False
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths(random):
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
-                    #print(node.name, node.val)
-                    MTTC, flag = computeCompNodes(node, detect_pro) 
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
+                    #print(node.name, val)
+                    MTTC, flag = computeCompNodes(node, val, detect_pro) 
                     totalTime += MTTC
                     
                     #Calculate the previous total compromise time
@@ -318,8 +334,9 @@ def computeMTTSF_Baseline(harm, net, attack_net, cflag, detect_pro, compNodes):
     totalNo = len(net.nodes)
     totalCount = 0
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
     #shuffle(harm.model.allpath)
     #harm.model.printPath()
     #print("number of attack paths:", ) 
@@ -327,12 +344,13 @@ def computeMTTSF_Baseline(harm, net, attack_net, cflag, detect_pro, compNodes):
     totalTime = 0
     security_failure = False
     break_flag = False
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths():
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
-                    print(node.name, node.val, node.type)
-                    MTTC, flag = computeCompNodes(node, detect_pro) 
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
+                    print(node.name, val, node.type)
+                    MTTC, flag = computeCompNodes(node, val, detect_pro) 
                     totalTime += MTTC
                     totalCount += 1
                     
@@ -362,8 +380,9 @@ def computeMTTSF_Interval(harm, net, decoy_net, interval_check, cflag, detect_pr
     totalNo = len(net.nodes)
 
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
     # shuffle(harm.model.allpath)
     #harm.model.printPath()
     #print("number of attack paths:", ) 
@@ -373,11 +392,12 @@ def computeMTTSF_Interval(harm, net, decoy_net, interval_check, cflag, detect_pr
     previousTotalTime = 0
     
     break_flag = False
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths():
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
-                    MTTC, flag = computeCompNodes(node, detect_pro) 
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
+                    MTTC, flag = computeCompNodes(node, val, detect_pro) 
                     totalTime += MTTC
                     
                     #Calculate the previous total compromise time
@@ -432,17 +452,11 @@ def computeMTTSF_RandomInterval(harm: object, net: object, decoy_net: object, in
     totalNo = len(net.nodes)
 
     #print(totalNo)
-    #Calculate the MTTC for each node on the attack path
-    harm.model.calcMTTC()
+    topo = harm.model.topology()
+    #MTTC of the nodes, computed when the attacker first reaches them (see ag.nodeValue)
+    mttc = harm.model.valueReader('mttc')
    # shuffle(harm.model.allpath)#Attacker randomly picks one entry point at a time
 
-
-    # Get all the entry points
-    all_entry_points = harm.model.allpath
-
-    # Randomly select an entry point
-    random_entry_point = random.choice(all_entry_points)
-
     #harm.model.printPath()
     #print("number of attack paths:", )
 
@@ -454,11 +468,12 @@ def computeMTTSF_RandomInterval(harm: object, net: object, decoy_net: object, in
     #print(interval_check)
     
     break_flag = False
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths():
         for node in path:
             if node is not harm.model.s and node is not harm.model.e:
-                if node.val > 0 and node.comp == False:
-                    MTTC, flag = computeCompNodes(node, detect_pro)
+                val = mttc(topo.idOf(node))
+                if val > 0 and node.comp == False:
+                    MTTC, flag = computeCompNodes(node, val, detect_pro)
                     totalTime += MTTC
                     
                     previousTotalTime = totalTime - MTTC
@@ -623,12 +638,9 @@ def system_risk(harm: object, net: object) -> object:
     max_value = 0
     cost = 0
     return_cost = 0
-    harm.model.calcRisk()
-    # Get all the entry points
-    all_entry_points = harm.model.allpath
-
+    path_return_cost = 0
     # Randomly select an entry point
-    random_entry_point = random.choice(all_entry_points)
+    random_entry_point = random.choice(harm.model.allpath)
 
     for path in random_entry_point:
         for node in net.nodes:
@@ -989,7 +989,23 @@ def hybridIntervalRS(initial_net, decoy_net, initial_info, pro, delay, packet):
     return mttsf, float(sum_ap)/float(i), float(defense_cost/mttsf), float(delivery_ratio/i)
 
 
-def hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, packet, thre, maxLength, start, diversity, diversity_percentage):
+def shuffleHARM(decoy_net, pathLength=None):
+    """
+    Copy the decoy network, add the attacker and construct the HARM.
+    @param pathLength: maximum attack path length (nodes between the attacker and the target, see ag.maxLength); None for all attack paths
+    """
+    shuffled_net = copyNet(decoy_net)
+    newnet = copyNet(shuffled_net)
+    newnet = add_attacker(newnet)
+    h = constructHARM(newnet, pathLength)
+    return shuffled_net, h
+
+
+def hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, packet, thre, maxLength, start, diversity, diversity_percentage, pathLength=None):
+    """
+    @param maxLength: maximum number of hops used by the heuristic shuffling
+    @param pathLength: maximum attack path length of the HARM (bounds path enumeration on large networks); None for all attack paths
+    """
 
     previous_ssl = 0
     compNodes = []
@@ -1014,10 +1030,7 @@ def hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, packet, t
         if diversity == True:
             update_decoy_vul(decoy_net, diversity_percentage)
 
-        shuffled_net = copyNet(decoy_net)
-        newnet = copyNet(shuffled_net)
-        newnet = add_attacker(newnet)
-        h = constructHARM(newnet)
+        shuffled_net, h = shuffleHARM(decoy_net, pathLength)
         totalAP = cost = decoyPath(h)
 
 
@@ -211,7 +211,7 @@ def heuShuffling(node_vlan_list, initial_net, decoy_net, decoy_list, initial_inf
 # Impact analysis on network size
 # ------------------------------------------------------------------------------------------------------
 
-def scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLen, start, diversity, diversity_percentage):
+def scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLen, start, diversity, diversity_percentage, pathLength=None):
     # decoy_num = {"ct": 2, "camera": 2, "tv": 2, "server": 1}
     decoy_num = {'mri': 2, 'ct': 2, 'thermostat': 2, 'meter': 2, 'camera': 2, 'tv': 2, 'laptop': 2, 'server': 1}
 
@@ -221,7 +221,7 @@ def scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ra
 
     # for i in range(0, sim):
     #     # mttsf, ave_ap, cost_hour, ratio = hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, varyPacket(), out_degree_ratio, maxLen)
-    #     mttsf, ave_ap, cost_hour, ratio, system_risk = hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, varyPacket(), out_degree_ratio, maxLen, start, diversity, diversity_percentage)
+    #     mttsf, ave_ap, cost_hour, ratio, system_risk = hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, varyPacket(), out_degree_ratio, maxLen, start, diversity, diversity_percentage, pathLength)
     #     if i == 0:
     #         saveOutput('scalability/hybrid_heu' + str(scale), 'w',
     #                    [str(mttsf), str(ave_ap), str(cost_hour), str(ratio), str(system_risk)], output_path)
@@ -232,9 +232,9 @@ def scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ra
     return None
 
 
-def runAndSave(initial_net, decoy_net, initial_info, pro, delay, packet, out_degree_ratio, maxLen, sim_id):
+def runAndSave(initial_net, decoy_net, initial_info, pro, delay, packet, out_degree_ratio, maxLen, sim_id, pathLength=None):
     try:
-        obj = hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, packet, out_degree_ratio, maxLen)
+        obj = hybridIntervalHS(initial_net, decoy_net, initial_info, pro, delay, packet, out_degree_ratio, maxLen, time.time(), False, 0, pathLength)
         saveOutput2("comparison/multiprocess_hybrid_heu_sim_%s" % (sim_id), "w+", [str(i) for i in obj], output_path)
         return None
 
@@ -242,10 +242,11 @@ def runAndSave(initial_net, decoy_net, initial_info, pro, delay, packet, out_deg
         return "ERROR: %s" % (err)
 
 
-def scalabilityAnalysisOnMultiprocess(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLen):
-    decoy_num = {"ct": 2, "camera": 2, "tv": 2, "server": 1}
+def scalabilityAnalysisOnMultiprocess(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLen, pathLength=None):
+    # decoy_num = {"ct": 2, "camera": 2, "tv": 2, "server": 1}
+    decoy_num = {'mri': 2, 'ct': 2, 'thermostat': 2, 'meter': 2, 'camera': 2, 'tv': 2, 'laptop': 2, 'server': 1}
 
-    initial_net, decoy_net, decoy_list, initial_info = beforeShuffleScale2(node_vlan_list, decoy_num,
+    initial_net, decoy_net, decoy_list, initial_info = beforeShuffleScale(node_vlan_list, decoy_num,
                                                                            varyAttackIntelligence(),
                                                                            varySSL(), varySSLDecrease(), scale)
 
@@ -253,7 +254,7 @@ def scalabilityAnalysisOnMultiprocess(node_vlan_list, interval, pro, sim, delay,
 
     results = [pool.apply_async(runAndSave,
                                 args=(initial_net, decoy_net, initial_info, pro, delay, varyPacket(), out_degree_ratio,
-                                      maxLen, sim_id)) for sim_id in range(0, sim)]
+                                      maxLen, sim_id, pathLength)) for sim_id in range(0, sim)]
 
     pool.close()
     pool.join()
@@ -348,6 +349,7 @@ if __name__ == '__main__':
     out_degree_ratio = 1.0
     scale = 5  # Set the number for real IoT devices (thermostat, meter, camera, tv, laptop)
     maxLength = 5  # Set the maximum path length
+    pathLength = 8  # Set the maximum attack path length of the HARM in scalability analysis (None for all attack paths)
 
     start = time.time()
     start_timer = time.time()
@@ -378,8 +380,8 @@ if __name__ == '__main__':
     """
     Scalability analysis
     """
-    #scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLength, start, diversity, diversity_percentage)
-    # scalabilityAnalysisOnMultiprocess(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLen)
+    #scalabilityAnalysis(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLength, start, diversity, diversity_percentage, pathLength)
+    # scalabilityAnalysisOnMultiprocess(node_vlan_list, interval, pro, sim, delay, out_degree_ratio, scale, maxLength, pathLength)
 
     """
     Plot results
@@ -24,7 +24,7 @@ def calcMessageDelivery(harm, dropThresh, modifyThresh):
     delivery = 0
     #harm.model.printPath()
 
-    for path in harm.model.allpath:
+    for path in harm.model.iterPaths():
         if checkPath(path, harm) == True:
             total += 1
             flag = False
@@ -12,6 +12,8 @@ class vulNode(node):
     """
     Create vulnerability object.
     """
+    __slots__ = ('privilege', 'val', 'type', 'severity', 'cost', 'base', 'impact', 'exploitability')
+
     def __init__(self, name):
         super(vulNode, self).__init__(name)
         
@@ -86,6 +88,7 @@ class vulNode(node):
         for v in node.vul.nodes:
             if v.privilege <= t:
                 s.con.append(v)        
+        node.vul.touch()
         return None
     
     
@@ -104,5 +107,6 @@ class vulNode(node):
         for v in node.vul.nodes:
             if v.privilege >= t:
                 v.con.append(e)
+        node.vul.touch()
         return None
 
@@ -7,14 +7,29 @@ This module constructs attack graph.
 from Node import *
 from Network import *
 from Vulnerability import *
+from PathCounting import *
+from PathRanking import *
+from ParallelPaths import *
+from PathStore import *
 from math import *
+import numpy as np
+import copy
+
+#Security metrics of the nodes, in the order returned by at.evaluate (see ag.nodeValues)
+metricNames = ('impact', 'cost', 'pro', 'risk', 'roa', 'mttc')
+metricIndex = {name: k for k, name in enumerate(metricNames)}
   
 class gnode(node):
     """
     Create attack graph node object.
     """
+    __slots__ = ('lazyChild', '_child', 'n', 'val', 'vuls', 'type', 'pro', 'critical', 'comp', 'prev_comp')
+
     def __init__(self, name):
         super(gnode, self).__init__(name)
+        #Lower layer built on first access: (function, arguments), see setLazyChild
+        self.lazyChild = None
+        self._child = None
         #Store the network node
         self.n = None
         #Store the Simulation value used in security analysis
@@ -28,16 +43,51 @@ class gnode(node):
         
     def __str__(self):
         return self.name
+
+    #Lower layer, built on first access if it was set lazily
+    @property
+    def child(self):
+        if self.lazyChild is not None:
+            build, args = self.lazyChild
+            self.lazyChild = None
+            self._child = build(*args)
+        return self._child
+
+    @child.setter
+    def child(self, child):
+        self.lazyChild = None
+        self._child = child
+
+    def setLazyChild(self, build, *args):
+        """
+        Set the lower layer to be built by build(*args) when it is first accessed, so analyses
+        which only need to know whether a node has a lower layer (e.g. counting paths) never build it.
+        """
+        self._child = None
+        self.lazyChild = (build, args)
+
+    #Whether the node has a lower layer, without building it
+    def hasChild(self):
+        return self.lazyChild is not None or self._child is not None
+
+    #Take the lower layer of another node, still unbuilt if it is lazy there
+    def shareChild(self, u):
+        self._child = u._child
+        self.lazyChild = u.lazyChild
     
                
 class gVulNode(vulNode):
     """
     Create attack graph vulnerability object.
     """
+    __slots__ = ('n', 'child')
+
     def __init__(self, name):
         super(gVulNode, self).__init__(name)
         #Store the vulnerability node
         self.n = None
+        #Store lower layer info
+        self.child = None
         #Store the Simulation value used in security analysis
         self.val = 0
         self.inPath = 0
@@ -50,6 +100,15 @@ class ag(network):
     """
     Create attack graph.
     """
+    #Attack graph nodes may share names (e.g. several attackers), so resolve connections by identity
+    byName = False
+    #Maximum attack path length (nodes between attacker and end point, as in MPL_metric); None for no bound
+    maxLength = None
+    #Only keep the k most likely attack paths (see topPaths); None for all attack paths
+    topK = None
+    topMetric = 'pro'
+    #Number of processes enumerating and counting attack paths by entry point; None to run serially
+    processes = None
     
     #Construct the attack graph
     def __init__(self, network, val, *arg):
@@ -58,6 +117,13 @@ class ag(network):
         #Store all possible paths from start to end
         self.allpath = []
         self.isAG = 1
+        #Successor lists without dead ends (see pathGraph) and pruning counters
+        self._pathGraph = None
+        self.pruning = None
+        #Attack graph with the same topology and lower layers whose attack paths are shared (see clone)
+        self.pathOrigin = None
+        #Topology and metric arrays of the nodes (see nodeValues)
+        self._nodeValues = None
         self.subnets = network.subnets  #All subnets in the network
         self.vuls = network.vuls        #All vuls in the network
                 
@@ -100,28 +166,16 @@ class ag(network):
 
 
         #Initialize connections for attack graph node   
-        for u in self.nodes:       
-            #print(u)
-            for v in u.n.con:
-                #For upper layer
-                if len(arg) is 0:
-                    for t in self.nodes:
-                        try:
-                            t_name = t.n.name
-                            v_name = v.name
-                        except:
-                            t_name = t.n.name
-                            v_name = v
-                        if t_name == v_name:
-                            #print("connections:", t.name)
-                            u.con.append(t)
-                #For lower layer
-                else:
-                    if arg[0] >= v.privilege:
-                        for t in self.nodes:
-                            if t.n is v:
-                                u.con.append(t) 
-        
+        #For upper layer: attack graph nodes share the integer ids of the network topology
+        if len(arg) == 0:
+            topo = network.topology()
+            for i in range(0, len(self.nodes)):
+                self.nodes[i].con.extend([self.nodes[j] for j in topo.successors(i)])
+        #For lower layer: successors within the privilege (see privilegeSuccessors)
+        else:
+            for i in range(0, len(self.nodes)):
+                self.nodes[i].con.extend([self.nodes[j] for j in network.privilegeSuccessors(i, arg[0])])
+
         #Initialize start and end in attack graph   
         for u in self.nodes:
             if u.n is network.s:
@@ -136,34 +190,307 @@ class ag(network):
             self.nodes.remove(self.e)           
     
     
-    #Traverse graph                  
-    def travelAgRecursive(self, u, e, path):
-        val = 0  
-        for v in u.con:
-
-            #Only include nodes with vulnerabilities in the path
-            if v.inPath == 0 and (v.child != None or v.name == 'ag_attacker' or v is e):
-                self.path.append(v)
-                v.inPath = 1
-                #print(self.path)
-                #Recursively traverse the path until to the end point
-                if v is not e:                
-                    val += self.travelAgRecursive(v, e, self.path)                            
+    def __getstate__(self):
+        #Do not copy or pickle the cached path graph and node values
+        state = super(ag, self).__getstate__()
+        state['_pathGraph'] = None
+        state['pathOrigin'] = None
+        state['_nodeValues'] = None
+        return state
+
+    #Attack graph nodes allowed in attack paths (by topology id)
+    def pathNodeMask(self, topo):
+        #Only include nodes with vulnerabilities in the path
+        return [(v.hasChild() if isinstance(v, gnode) else v.child != None) or v.name == 'ag_attacker' or v is self.e for v in topo.nodes]
+
+    #Traverse graph with an explicit stack
+    def walkPathIds(self, rand=None):
+        """
+        Generate attack paths from start to end as lists of topology ids, without recursion.
+        Visited nodes are kept in a per-call bitmask instead of node flags, so several traversals
+        can be interleaved on the same graph (e.g. nested generators). The traversal does fill the
+        cached topology (of this graph, and claims its nodes, see network.topology) and path graph
+        (see pathGraph) on first use and after changes, so call them once before sharing a graph
+        between threads; processes get their own copies.
+
+        :param rand: random number generator (e.g. the random module); if given, the successors \
+                     of every node on the path are visited in random order
+        :returns: generator of attack paths
+        """
+        topo = self.topology()
+        s = topo.idOf(self.s)
+        e = topo.idOf(self.e)
+        if s is None or e is None:
+            return
+        adj, dist = self.pathGraph()
+        for ids in walkSimplePaths(adj, dist, self.pathBudget(), [s], e, rand):
+            yield ids
+
+    #Number of connections allowed on an attack path (start, attacker and end point included)
+    def pathBudget(self):
+        if self.maxLength is None:
+            return None
+        return self.maxLength + 2
+
+    def pathGraph(self):
+        """
+        Prune dead ends before traversal: search backwards from the end point once to find the
+        productive nodes (nodes allowed in attack paths which can reach the end point) and keep
+        only connections into them. The result is cached until the topology or the lower layers change.
+
+        :returns: filtered successor lists and the number of connections from every node to the \
+                  end point (None if it cannot be reached), both by topology id
+        """
+        topo = self.topology()
+        ok = self.pathNodeMask(topo)
+        if self._pathGraph is not None and self._pathGraph[0] is topo and self._pathGraph[1] == ok:
+            return self._pathGraph[2], self._pathGraph[3]
+
+        dist = [None] * len(topo)
+        e = topo.idOf(self.e)
+        if e is not None:
+            pred = [[] for i in range(0, len(topo))]
+            for u in range(0, len(topo)):
+                for v in topo.adj[u]:
+                    pred[v].append(u)
+            dist[e] = 0
+            queue = [e]
+            for v in queue:
+                for u in pred[v]:
+                    if dist[u] is None:
+                        dist[u] = dist[v] + 1
+                        #Nodes outside attack paths can only start a path
+                        if ok[u]:
+                            queue.append(u)
+
+        adj = []
+        for u in range(0, len(topo)):
+            adj.append([v for v in topo.adj[u] if ok[v] and dist[v] is not None])
+
+        #Report how much of the graph is never entered by the traversal
+        self.pruning = {'nodes': len(topo),
+                        'deadEnds': len([u for u in range(0, len(topo)) if ok[u] and dist[u] is None]),
+                        'excluded': ok.count(False),
+                        'connections': len(topo.targets),
+                        'prunedConnections': len(topo.targets) - sum([len(succ) for succ in adj])}
+        self._pathGraph = (topo, ok, adj, dist)
+        return adj, dist
+
+    def samplePath(self, rand):
+        """
+        Walk one random attack path from start to end for Monte Carlo estimation (Knuth's estimator).
+        At every node the next hop is drawn uniformly among the successors which keep the path simple
+        and can still reach the end point, and the weight is multiplied by their number, so the weight
+        is the inverse probability of drawing the path. Averaging weight * f(path) over many walks
+        estimates the sum of f over all attack paths without enumerating them.
+
+        :param rand: random number generator (e.g. the random module)
+        :returns: weight and attack path as a list of topology ids, or (0, None) if the walk gets stuck
+        """
+        topo = self.topology()
+        s = topo.idOf(self.s)
+        e = topo.idOf(self.e)
+        if s is None or e is None:
+            return 0, None
+        adj, dist = self.pathGraph()
+        budget = self.pathBudget()
+
+        path = [s]
+        visited = 1 << s
+        weight = 1
+        while path[-1] != e:
+            succ = [v for v in adj[path[-1]] if not (visited >> v) & 1 and \
+                    (budget is None or len(path) + dist[v] <= budget)]
+            if not succ:
+                return 0, None
+            weight *= len(succ)
+            v = succ[int(rand.random() * len(succ))]
+            path.append(v)
+            visited |= 1 << v
+        return weight, path
+
+
+    def iterPaths(self, rand=None, walk=False):
+        """
+        Stream attack paths without building the full path list.
+        Paths already computed by calcPath are reused; otherwise they are generated on demand,
+        so a consumer that stops early only pays for the paths it has taken.
+
+        :param rand: random number generator (e.g. the random module); if given, the attack \
+                     paths are visited in uniformly random order (all of them are enumerated first)
+        :param walk: if True (with rand), pick a random next hop at each step instead, without \
+                     enumerating all paths; paths through nodes with few successors are then \
+                     more likely to come first
+        :returns: generator of attack paths (lists of attack graph nodes)
+        """
+        if rand is None and self.computedPaths() is not None:
+            for path in self._allpath:
+                yield path
+            return
+        #The attacker picks an attack path uniformly at random
+        if self.topK is not None or (rand is not None and not walk):
+            paths = list(self.allpath)
+            if rand is not None:
+                rand.shuffle(paths)
+            for path in paths:
+                yield path
+            return
+        nodes = self.topology().nodes
+        for ids in self.walkPathIds(rand):
+            yield [nodes[i] for i in ids]
+
+    #Enumerate all attack paths (or the most likely ones) into a prefix trie
+    def buildPathStore(self):
+        store = pathStore(self.topology().nodes)
+        if self.topK is not None:
+            store.extend([ids for val, ids in self.topPathIds(self.topK, self.topMetric)])
+        elif self.processes is not None:
+            topo = self.topology()
+            s = topo.idOf(self.s)
+            e = topo.idOf(self.e)
+            if s is not None and e is not None:
+                adj, dist = self.pathGraph()
+                store.extend(enumeratePathsParallel(adj, dist, self.pathBudget(), s, e, self.processes))
+        else:
+            store.extend(self.walkPathIds())
+        return store
+
+    #Weight of entering each node when ranking attack paths
+    def pathWeights(self, metric):
+        topo = self.topology()
+        weight = [0.0] * len(topo)
+        for i in range(0, len(topo)):
+            u = topo.nodes[i]
+            if u.child is None:
+                continue
+            #Most likely paths: maximise the product of probabilities, i.e. minimise the sum of -log
+            if metric == 'pro':
+                pro = u.child.calcPro()
+                if pro > 0:
+                    weight[i] = -log(min(pro, 1.0))
                 else:
-                    self.allpath.append(path[:])
+                    weight[i] = float('inf')
+            #Fastest paths: minimise the sum of the mean time to compromise
+            elif metric == 'mttc':
+                weight[i] = u.child.calcMTTC()
+            else:
+                raise ValueError("Unknown path metric: %s" % (metric))
+        return weight
 
-                self.path.pop() 
-                v.inPath = 0
+    def topPathIds(self, k, metric='pro'):
+        """
+        :returns: list of (path value, attack path as a list of topology ids), best first; \
+                  the value is the success probability for 'pro' and the MTTC for 'mttc'
+        """
+        topo = self.topology()
+        s = topo.idOf(self.s)
+        e = topo.idOf(self.e)
+        if s is None or e is None:
+            return []
+        adj, dist = self.pathGraph()
+        weight = self.pathWeights(metric)
+        adj = [[v for v in succ if weight[v] != float('inf')] for succ in adj]
+        paths = []
+        for val, ids in kShortestPaths(adj, weight, s, e, k):
+            if metric == 'pro':
+                val = exp(-val)
+            paths.append((val, ids))
+        return paths
 
-        return val
+    def topPaths(self, k, metric='pro'):
+        """
+        Find the k attack paths with the highest success probability (metric 'pro', the product of
+        child.calcPro() along the path) or the lowest MTTC (metric 'mttc', the sum of child.calcMTTC()).
+        Setting topK (and topMetric) makes these paths the path source of the attack graph instead
+        of all attack paths, e.g. for computeMTTSF and system_risk. The length bound is not applied.
+
+        :param k: maximum number of attack paths
+        :param metric: 'pro' or 'mttc'
+        :returns: list of attack paths (lists of attack graph nodes), best first
+        """
+        nodes = self.topology().nodes
+        return [[nodes[i] for i in ids] for val, ids in self.topPathIds(k, metric)]
+
+    #All attack paths (list-like prefix trie), computed on first use
+    @property
+    def allpath(self):
+        if self.computedPaths() is None:
+            if self.sharesPaths():
+                self._allpath = self.pathOrigin.allpath.view(self.topology().nodes)
+            else:
+                self._allpath = self.buildPathStore()
+        return self._allpath
+
+    @allpath.setter
+    def allpath(self, paths):
+        self._allpath = paths
+
+    #Count attack paths from every node without enumerating them
+    def pathCounts(self, target=None):
+        """
+        Count attack paths by dynamic programming on the strongly connected components.
+
+        :param target: function on the last node before the end point; if given, only attack \
+                       paths through a matching node are counted
+        :returns: list with the number of attack paths from each node (by topology id)
+        """
+        ok, weight = self.pathCountWeights(target)
+        return countSimplePaths(self.topology().adj, ok, weight)
+
+    #Nodes allowed in counted paths and the weight of each node
+    def pathCountWeights(self, target=None):
+        topo = self.topology()
+        ok = self.pathNodeMask(topo)
+        weight = [0] * len(topo)
+        e = topo.idOf(self.e)
+        if e is not None:
+            #Paths stop at the end point, so weight the nodes connected to it instead
+            ok[e] = False
+            for i in range(0, len(topo)):
+                if target is None or target(topo.nodes[i]):
+                    weight[i] = topo.adj[i].count(e)
+        return ok, weight
+
+    #Count attack paths from start to end
+    def countPaths(self, target=None):
+        #The counting does not bound or rank paths, so count the enumerated paths instead
+        if self.maxLength is not None or self.topK is not None:
+            if target is None:
+                return len(self.allpath)
+            paths = self.allpath
+            if isinstance(paths, pathStore):
+                last = paths.nodesFromEnd(1)
+            else:
+                last = [path[-2] for path in paths]
+            return len([u for u in last if u is not None and target(u)])
+        topo = self.topology()
+        s = topo.idOf(self.s)
+        if s is None:
+            return 0
+        if self.processes is not None:
+            ok, weight = self.pathCountWeights(target)
+            return countPathsParallel(topo.adj, ok, weight, s, self.processes)
+        return self.pathCounts(target)[s]
+
+    #Export attack paths as ragged arrays of topology ids
+    def pathArrays(self):
+        """
+        :returns: flat int32 array of topology ids and int64 offsets; path i is flat[offsets[i]:offsets[i+1]]
+        """
+        paths = self.allpath
+        if isinstance(paths, pathStore):
+            return paths.toRagged()
+        topo = self.topology()
+        offsets = np.zeros(len(paths)+1, dtype=np.int64)
+        np.cumsum([len(path) for path in paths], out=offsets[1:])
+        flat = np.fromiter((topo.idOf(u) for path in paths for u in path), dtype=np.int32, count=int(offsets[-1]))
+        return flat, offsets
 
     #Traverse graph to get attack paths
     def travelAg(self): 
-        self.allpath = []
         #Start to traverse from start point
-        self.path = [self.s]
-        #print(self.s.name)
-        val = self.travelAgRecursive(self.s, self.e, self.path) #The value records recursion times  
+        self.allpath = self.buildPathStore()
+        val = len(self.allpath) #The value records the number of paths
 
         return val   
     
@@ -220,6 +547,276 @@ class ag(network):
     #Calculate attack paths
     def calcPath(self):
         return self.travelAg()
+
+    #Drop computed attack paths so that they are generated again on first use
+    def resetPath(self):
+        self.allpath = None
+
+    #Whether attack paths can be taken from the origin of a clone
+    def sharesPaths(self):
+        origin = self.pathOrigin
+        if origin is None or (origin._allpath is not None and not isinstance(origin._allpath, pathStore)):
+            return False
+        return origin.maxLength == self.maxLength and origin.topK == self.topK and origin.topMetric == self.topMetric
+
+    #Attack paths computed by this graph or already computed by its origin, None otherwise
+    def computedPaths(self):
+        if self._allpath is None and self.sharesPaths() and self.pathOrigin._allpath is not None:
+            self._allpath = self.pathOrigin._allpath.view(self.topology().nodes)
+        return self._allpath
+
+    def clone(self, network):
+        """
+        Create the attack graph of a network with the same topology and vulnerabilities, e.g. a
+        repeated candidate or shuffle. Node states are taken from the network, lower layers are shared
+        and attack paths are taken from this graph once computed, so they are enumerated once for both.
+        Shared lower layers and attack paths must not be modified.
+
+        :param network: network with start and end (see add_attacker)
+        :returns: attack graph
+        """
+        g = ag(network, 1)
+        g.resetPath()
+        topo = self.topology()
+        for u, v in zip(g.topology().nodes, topo.nodes):
+            if isinstance(u, gnode) and isinstance(v, gnode):
+                u.shareChild(v)
+            else:
+                u.child = v.child
+        g.maxLength = self.maxLength
+        g.topK = self.topK
+        g.topMetric = self.topMetric
+        g.processes = self.processes
+        g.pathOrigin = self
+        return g
+
+    def maskEdges(self, keep):
+        """
+        Create the attack graph with only some of the connections of this graph, e.g. one candidate of a
+        population whose connections are a subset of this (union) graph. Nodes are copied with their
+        states; lower layers and node values (see nodeValues) are shared, attack paths are computed anew.
+
+        :param keep: boolean array over the connections of the topology (its targets), True to keep
+        :returns: attack graph
+        """
+        topo = self.topology()
+        values = self.valueTable()
+        g = copy.copy(self)
+        nodes = [copy.copy(u) for u in topo.nodes]
+        offsets = topo.offsets.tolist()
+        targets = topo.targets.tolist()
+        keep = np.asarray(keep, dtype=bool).tolist()
+        for i, u in enumerate(nodes):
+            u.con = [nodes[targets[p]] for p in range(offsets[i], offsets[i+1]) if keep[p]]
+        g.s = nodes[topo.idOf(self.s)] if self.s is not None else None
+        g.e = nodes[topo.idOf(self.e)] if self.e is not None else None
+        g.nodes = [nodes[i] for i in range(0, len(nodes)) if topo.nodes[i] is not self.s and topo.nodes[i] is not self.e]
+        g.path = []
+        g.resetPath()
+        g.pruning = None
+        g._nodeValues = (g.topology(),) + values[1:]
+        return g
+
+    #---------------------------------------------------------------------------------------------
+    #Incremental maintenance: update connections without rebuilding the attack graph
+
+    def applyEdgeDelta(self, added=(), removed=()):
+        """
+        Add and remove connections between attack graph nodes.
+        Connections are treated as a set (as in connectOneWay): added ones are appended if missing,
+        removed ones are dropped. Only attack paths using a changed connection are recomputed.
+
+        :param added: list of (node, node) pairs, given as attack graph nodes or their names
+        :param removed: list of (node, node) pairs, given as attack graph nodes or their names
+        :returns: None
+        """
+        topo = self.topology()
+        addedIds = set()
+        removedIds = set()
+        changed = False
+        for u, v in removed:
+            i, j = self.edgeIds(topo, u, v)
+            u = topo.nodes[i]
+            if topo.nodes[j] in u.con:
+                u.con = [t for t in u.con if t is not topo.nodes[j]]
+                removedIds.add((i, j))
+                changed = True
+        for u, v in added:
+            i, j = self.edgeIds(topo, u, v)
+            u = topo.nodes[i]
+            if topo.nodes[j] not in u.con:
+                u.con.append(topo.nodes[j])
+                changed = True
+                #Removed and added again: the same paths remain, only their order changes
+                if (i, j) in removedIds:
+                    removedIds.discard((i, j))
+                else:
+                    addedIds.add((i, j))
+        if changed:
+            self.touch()
+            self.pathOrigin = None
+            self.updatePaths(addedIds, removedIds)
+        return None
+
+    #Resolve a connection given by nodes or names to topology ids
+    def edgeIds(self, topo, u, v):
+        ids = []
+        for t in [u, v]:
+            if isinstance(t, str):
+                ids.append(topo.ids(t)[0])
+            else:
+                ids.append(topo.idOf(t))
+        return ids[0], ids[1]
+
+    def syncNetwork(self, network):
+        """
+        Update the attack graph in place to match a network with the same nodes, e.g. the next
+        shuffled copy of the network with the attacker added.
+        Node states are copied and only attack paths using a changed connection are recomputed.
+        Lower layers are kept; rebuild them if vulnerabilities changed.
+
+        :param network: network with start and end (see add_attacker)
+        :returns: False if the nodes differ and the attack graph must be rebuilt, True otherwise
+        """
+        topo = self.topology()
+        netTopo = network.topology()
+        if ['ag_'+str(name) for name in netTopo.names] != topo.names:
+            return False
+
+        addedIds = set()
+        removedIds = set()
+        changed = False
+        for i in range(0, len(topo)):
+            u = topo.nodes[i]
+            v = netTopo.nodes[i]
+            u.n = v
+            if v is not network.s and v is not network.e:
+                u.type = v.type
+                u.pro = v.pro
+                u.critical = v.critical
+                u.comp = v.comp
+                u.prev_comp = v.prev_comp
+            #Keep the connection order of the network, as a rebuild would
+            if netTopo.adj[i] != topo.adj[i]:
+                changed = True
+                old = set(topo.adj[i])
+                new = set(netTopo.adj[i])
+                addedIds.update((i, j) for j in new - old)
+                removedIds.update((i, j) for j in old - new)
+                u.con = [topo.nodes[j] for j in netTopo.adj[i]]
+        if changed:
+            self.touch()
+            self.pathOrigin = None
+            self.updatePaths(addedIds, removedIds)
+        return True
+
+    def updatePaths(self, addedIds, removedIds):
+        """
+        Update computed attack paths after connections changed: drop the paths using a removed
+        connection, enumerate only the paths using an added one, and restore traversal order.
+
+        :param addedIds: set of added connections as pairs of topology ids
+        :param removedIds: set of removed connections as pairs of topology ids
+        :returns: None
+        """
+        store = self._allpath
+        if store is None:
+            return None
+        if not isinstance(store, pathStore) or self.topK is not None:
+            self.resetPath()
+            return None
+
+        topo = self.topology()
+        n = len(topo)
+        flat, offsets = store.toRagged()
+        keep = np.ones(len(store), dtype=bool)
+        if removedIds and len(flat) > 1:
+            #Code each connection along the paths as one integer
+            codes = flat[:-1].astype(np.int64)*n + flat[1:]
+            bad = np.isin(codes, np.array([i*n+j for i, j in removedIds], dtype=np.int64))
+            #Pairs across two paths are not connections
+            bad[offsets[1:-1]-1] = False
+            bad = np.append(bad, False)
+            keep = np.add.reduceat(bad.astype(np.int64), offsets[:-1]) == 0
+
+        paths = [flat[offsets[k]:offsets[k+1]].tolist() for k in np.nonzero(keep)[0]]
+        if addedIds:
+            paths.extend(self.walkPathIdsUsing(addedIds))
+
+        #Traversal order is the order of successor positions along the path
+        position = []
+        for succ in topo.adj:
+            pos = {}
+            for k in range(len(succ)-1, -1, -1):
+                pos[succ[k]] = k
+            position.append(pos)
+        paths.sort(key=lambda ids: [position[ids[k]][ids[k+1]] for k in range(0, len(ids)-1)])
+
+        store = pathStore(topo.nodes)
+        store.extend(paths)
+        self._allpath = store
+        return None
+
+    def walkPathIdsUsing(self, edges):
+        """
+        Generate the attack paths which use at least one of the given connections.
+        Branches which have not used one yet and cannot reach one are pruned.
+
+        :param edges: set of connections as pairs of topology ids
+        :returns: generator of attack paths as lists of topology ids
+        """
+        topo = self.topology()
+        s = topo.idOf(self.s)
+        e = topo.idOf(self.e)
+        if s is None or e is None:
+            return
+        adj, dist = self.pathGraph()
+        budget = self.pathBudget()
+
+        #Nodes which can reach the start of a given connection
+        reach = [False] * len(topo)
+        pred = [[] for i in range(0, len(topo))]
+        for u in range(0, len(topo)):
+            for v in adj[u]:
+                pred[v].append(u)
+        todo = list(set(i for i, j in edges))
+        for u in todo:
+            reach[u] = True
+        while todo:
+            v = todo.pop()
+            for u in pred[v]:
+                if not reach[u]:
+                    reach[u] = True
+                    todo.append(u)
+
+        path = [s]
+        #Number of given connections used so far on the path
+        used = [0]
+        todo = [orderSuccessors(adj[s], None)]
+        visited = 1 << s
+        while path:
+            if not todo[-1]:
+                visited &= ~(1 << path.pop())
+                used.pop()
+                todo.pop()
+                continue
+            u = path[-1]
+            v = todo[-1].pop()
+            if (visited >> v) & 1:
+                continue
+            if budget is not None and len(path) + dist[v] > budget:
+                continue
+            count = used[-1] + ((u, v) in edges)
+            if count == 0 and not reach[v]:
+                continue
+            if v == e:
+                if count > 0:
+                    yield path + [e]
+            else:
+                path.append(v)
+                used.append(count)
+                todo.append(orderSuccessors(adj[v], None))
+                visited |= 1 << v
     
     
     
@@ -289,6 +886,70 @@ class ag(network):
         self.getMTTCValue()
 
         
+    def nodeValues(self):
+        """
+        Compute the security metrics of all nodes at once, without writing them into node.val, so
+        metrics computed one after another (e.g. risk after MTTC) do not overwrite each other.
+        Nodes with a lower layer take its values (see at.evaluate), other nodes keep their value.
+        This builds every lazy lower layer; use nodeValue for the nodes actually visited.
+
+        :returns: dictionary from metric name (impact, cost, pro, risk, roa, mttc) to numpy array \
+                  indexed by topology id
+        """
+        topo, table, done = self.valueTable()
+        self.fillValues(topo, table, done, np.nonzero(~done)[0].tolist())
+        return dict(zip(metricNames, table))
+
+    def nodeValue(self, name, i):
+        """
+        Return one security metric of one node as nodeValues does, computing the values of the node
+        (and building its lower layer) on first access only.
+
+        :param name: metric name (impact, cost, pro, risk, roa, mttc)
+        :param i: topology id of the node
+        :returns: value of the metric
+        """
+        return self.valueReader(name)(i)
+
+    def valueReader(self, name):
+        """
+        Return a function from topology id to one security metric of the node (see nodeValue), for
+        loops over many nodes; it is valid while the topology does not change.
+        """
+        topo, table, done = self.valueTable()
+        row = table[metricIndex[name]]
+        def read(i):
+            if not done[i]:
+                self.fillValues(topo, table, done, [i])
+            return float(row[i])
+        return read
+
+    def valueTable(self):
+        """
+        Return the table of node values by metric and topology id (NaN until computed) with the mask
+        of the computed nodes. The table is kept per topology; a clone shares it with its origin.
+        """
+        topo = self.topology()
+        if self._nodeValues is None or self._nodeValues[0] is not topo:
+            origin = self.pathOrigin
+            if origin is not None and origin._nodeValues is not None and len(origin._nodeValues[0]) == len(topo):
+                table, done = origin._nodeValues[1:]
+            else:
+                table = np.full((len(metricNames), len(topo)), np.nan)
+                done = np.zeros(len(topo), dtype=bool)
+            self._nodeValues = (topo, table, done)
+        return self._nodeValues
+
+    #Compute the values of the given nodes into the table
+    def fillValues(self, topo, table, done, ids):
+        for i in ids:
+            u = topo.nodes[i]
+            if u.child is not None:
+                table[:, i] = u.child.evaluate()
+            else:
+                table[:, i] = u.val
+            done[i] = True
+
     #When the node in the upper layer has one vulnerability, calculate the value for parent node 
     def getNodeValue(self):
         for u in self.nodes:
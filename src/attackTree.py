@@ -6,17 +6,28 @@ This module constructs attack tree.
 from Node import *
 from Network import *
 from Vulnerability import *
+import numpy as np
+
+#Opcodes of compiled attack trees (see at.compile)
+OP_LEAF = 0
+OP_OTHER = 1
+OP_AND = 2
+OP_OR = 3
 
 
 class tNode(node):
     """
     Create attack tree node object.
     """
+    __slots__ = ('n', 't', 'val', 'command', 'child')
+
     def __init__(self, name):
         super(tNode, self).__init__(name)
         self.n = None
         self.t = "node"
         self.val = 0
+        #Store lower layer info
+        self.child = None
     
     def __str__(self):
         return self.name
@@ -25,6 +36,8 @@ class tVulNode(vulNode):
     """
     Create attack tree vulnerability object.
     """
+    __slots__ = ('n', 't', 'command', 'vulname')
+
     def __init__(self, name):
         super(tVulNode, self).__init__(name)
         self.n = None
@@ -36,11 +49,15 @@ class tVulNode(vulNode):
         return self.name
       
 class andGate(node):
+    __slots__ = ('t',)
+
     def __init__(self):
         super(andGate, self).__init__("andGate")
         self.t = "andGate"
 
 class orGate(node):
+    __slots__ = ('t',)
+
     def __init__(self):
         super(orGate, self).__init__("orGate")
         self.t = "orGate"
@@ -50,11 +67,16 @@ class at(object):
     """
     Create attack tree.
     """
+    #Build the lower layer as a gate graph with shared sub-gates instead of a tree (see constructShared)
+    shareGates = False
+
     def __init__(self, network, val, *arg):
         self.nodes = []
         self.topGate = None
         self.construct(network, val, *arg)
         self.isAG = 0
+        #Flattened postorder program of the tree, compiled on first evaluation
+        self.program = None
     
     #Preprocess for the construction
     def preprocess(self, network, nodes, val, *arg):  
@@ -86,20 +108,18 @@ class at(object):
                 nodes.append(tn)   
         
         #Initialize connections for attack tree node                         
-        for u in nodes:
-            for v in u.n.con:
-                #For upper layer
-                if len(arg) is 0:
-                    for t in nodes:
-                        if t.n is v:
-                            u.con.append(t)
-                #For lower layer
-                else:
-                    # Privilege value is used here to decide what vulnerabilities an attacker can use for attack paths 
-                    if v.privilege is not None and arg[0] >= v.privilege:
-                        for t in nodes:
-                            if t.n is v:
-                                u.con.append(t)      
+        #For upper layer
+        if len(arg) == 0:
+            tnodes = {id(u.n): u for u in nodes}
+            for u in nodes:
+                for v in u.n.con:
+                    if id(v) in tnodes:
+                        u.con.append(tnodes[id(v)])
+        #For lower layer: nodes are in topology order
+        else:
+            # Privilege value is used here to decide what vulnerabilities an attacker can use for attack paths 
+            for i, u in enumerate(nodes):
+                u.con.extend([nodes[j] for j in network.privilegeSuccessors(i, arg[0])])
         return None
     
     #Construct the attack tree
@@ -124,9 +144,93 @@ class at(object):
                 if u.n is network.s:
                     self.topGate.con.append(u)  
             
-            self.simplify(self.topGate, history, e)
-            self.targetOut(self.topGate, e)
-            self.foldgate(self.topGate)
+            if self.shareGates:
+                self.constructShared(self.topGate, e)
+            else:
+                self.simplify(self.topGate, history, e)
+                self.targetOut(self.topGate, e)
+                self.foldgate(self.topGate)
+
+    def constructShared(self, rootGate, target):
+        """
+        Build the gates of simplify, targetOut, deleteEmptyGates and foldgate directly, sharing sub-gates.
+        The gates below a node only depend on the node and on the part of the path history its
+        expansion can meet, so each such pair is built once (hash-consing) and reused wherever it occurs.
+        The children of every gate are in the same order as in the tree, so evaluation gives the same values.
+        """
+        memo = {}
+        self.nothing = tNode('at-.')
+        self.nothing.val = 1
+        #targetOut connects the first level gates to the target before deleting and folding gates
+        children = [u for u in rootGate.con if u is target or u.t != "node"] + \
+                   [self.expandShared(u, frozenset(), target, memo, [target]) for u in rootGate.con if u is not target and u.t == "node"]
+        rootGate.con = self.finishGate(self.targetOutShared(children, target), [])
+
+    #Expand a node as simplify does: the node and an OR gate of its successors not in the history
+    def expandShared(self, item, history, target, memo, tail=None):
+        succ = [u for u in item.con if u not in history]
+        if len(succ) == 0:
+            return item
+        key = None
+        if tail is None:
+            key = (id(item), self.relevantHistory(item, history, target))
+            if key in memo:
+                return memo[key]
+
+        history = history | set([item])
+        children = [u for u in succ if u is target or u.t != "node"] + \
+                   [self.expandShared(u, history, target, memo) for u in succ if u is not target and u.t == "node"]
+        o_gate = orGate()
+        o_gate.con = self.targetOutShared(children, target)
+        if o_gate.con is not None:
+            o_gate.con = self.finishGate(o_gate.con, [])
+            con = [item, o_gate]
+        else:
+            #deleteEmptyGates drops OR gates which only led to the target
+            con = [item]
+        a_gate = andGate()
+        a_gate.con = self.finishGate(con, tail or [])
+        if key is not None:
+            memo[key] = a_gate
+        return a_gate
+
+    #Part of the history which the expansion of a node can meet
+    def relevantHistory(self, item, history, target):
+        if not history:
+            return frozenset()
+        seen = set([item])
+        todo = [item]
+        met = set()
+        while todo:
+            u = todo.pop()
+            if u is target or u.t != "node":
+                continue
+            for v in u.con:
+                if v in history:
+                    met.add(id(v))
+                elif v not in seen:
+                    seen.add(v)
+                    todo.append(v)
+        return frozenset(met)
+
+    #targetOutRecursive on one gate: None for a gate which only holds the target
+    def targetOutShared(self, con, target):
+        if len(con) == 1 and con[0] is target:
+            return None
+        count = len([u for u in con if u is target])
+        return [u for u in con if u is not target] + [self.nothing] * count
+
+    #deleteEmptyGates and foldgate on one gate; tail is appended between the two (see targetOut)
+    def finishGate(self, con, tail):
+        con = con + tail
+        removedGates = []
+        for node in con:
+            if node.t in ['andGate', 'orGate'] and len(node.con) == 1:
+                con.append(node.con[0])
+                removedGates.append(node)
+        for node in removedGates:
+            con.remove(node)
+        return con
 
     #Simplify the method
     def simplify(self, gate, history, target):
@@ -270,149 +374,171 @@ class at(object):
 
     #----------------------------------------------------------------------------------------------    
     #AT is lower layer
-   
-    #Calculate the impact value for each node in the attack tree
-    def calcImpactRecursive(self, s):    
-        if s.t is "andGate":
-            val = 0
-            for u in s.con:                
-                val += self.calcImpactRecursive(u) 
-                #print ('and:', val)
-        elif s.t is "orGate":
-            val = 0
-            for u in s.con:
-                tval = self.calcImpactRecursive(u)
-                if tval >= val:
-                    val = tval 
-        elif s.t is "node":
-            val = s.val
-        else:
-            val = 0
-        return val
-    
+
+    def compile(self):
+        """
+        Flatten the gates into a postorder program of (opcode, argument) pairs: a leaf node with the
+        node as argument, a gate with the positions of its children in the program.
+        Each node is emitted once, so gates shared by several parents (see shareGates) are evaluated once.
+        Leaf values are read when the program runs, so value changes need no recompilation.
+        """
+        program = []
+        #Position of each emitted node in the program
+        slot = {}
+        #Iterative postorder: a gate is emitted after all of its children
+        todo = [(self.topGate, False)]
+        while todo:
+            s, expanded = todo.pop()
+            if id(s) in slot:
+                continue
+            if s.t == "andGate" or s.t == "orGate":
+                if expanded:
+                    slot[id(s)] = len(program)
+                    program.append((OP_AND if s.t == "andGate" else OP_OR, tuple([slot[id(u)] for u in s.con])))
+                else:
+                    todo.append((s, True))
+                    for u in reversed(s.con):
+                        todo.append((u, False))
+            elif s.t == "node":
+                slot[id(s)] = len(program)
+                program.append((OP_LEAF, s))
+            else:
+                slot[id(s)] = len(program)
+                program.append((OP_OTHER, None))
+        self.program = program
+        return program
+
+    def evaluate(self):
+        """
+        Evaluate all metrics of the tree in one pass over the compiled program, keeping the value of each node.
+        Impact, risk, return on attack and MTTC share one rule (sum over AND, maximum over OR).
+
+        :returns: impact, cost, probability, risk, return on attack and MTTC, \
+                  equal to calcImpact, calcCost, calcPro, calcRisk, calcReturnOnAttack and calcMTTC
+        """
+        program = self.program
+        if program is None:
+            program = self.compile()
+        values = []
+        for op, arg in program:
+            if op == OP_LEAF:
+                v = arg.val
+                values.append((v, v, v if v > 0 else 1.0))
+            elif op == OP_OTHER:
+                values.append((0, 0, 1.0))
+            else:
+                children = [values[i] for i in arg]
+                if op == OP_AND:
+                    val = 0
+                    cost = 0
+                    pro = 1.0
+                    for tval, tcost, tpro in children:
+                        val += tval
+                        cost += tcost
+                        pro *= tpro
+                else:
+                    val = 0
+                    pro = 1.0
+                    for tval, tcost, tpro in children:
+                        if tval >= val:
+                            val = tval
+                        if tpro > 0:
+                            pro *= (1.0-tpro)
+                    pro = 1.0-pro
+                    #choose the minimum cost value
+                    cost = min([tcost for tval, tcost, tpro in children])
+                values.append((val, cost, pro))
+        val, cost, pro = values[-1]
+        return val, cost, pro, val, val, val
+
+    def evaluateSamples(self, samples):
+        """
+        Evaluate all metrics of the tree over N parameter samples at once with numpy arrays,
+        e.g. for sensitivity studies on vulnerability values. The program is the one of evaluate,
+        so every sample gives exactly the value evaluate would give for it.
+
+        :param samples: dictionary mapping vulnerability names (e.g. CVE ids) to arrays of N values; \
+                        leaves without samples keep their value
+        :returns: arrays of N impact, cost, probability, risk, return on attack and MTTC values
+        """
+        program = self.program
+        if program is None:
+            program = self.compile()
+        n = len(next(iter(samples.values()))) if samples else 1
+        values = []
+        for op, arg in program:
+            if op == OP_LEAF:
+                name = getattr(arg, 'vulname', None)
+                if name in samples:
+                    v = np.asarray(samples[name], dtype=float)
+                else:
+                    v = np.full(n, float(arg.val))
+                values.append((v, v, np.where(v > 0, v, 1.0)))
+            elif op == OP_OTHER:
+                values.append((np.zeros(n), np.zeros(n), np.ones(n)))
+            else:
+                children = [values[i] for i in arg]
+                if op == OP_AND:
+                    val = np.zeros(n)
+                    cost = np.zeros(n)
+                    pro = np.ones(n)
+                    for tval, tcost, tpro in children:
+                        val = val + tval
+                        cost = cost + tcost
+                        pro = pro * tpro
+                else:
+                    val = np.zeros(n)
+                    pro = np.ones(n)
+                    for tval, tcost, tpro in children:
+                        val = np.where(tval >= val, tval, val)
+                        pro = np.where(tpro > 0, pro * (1.0-tpro), pro)
+                    pro = 1.0-pro
+                    #choose the minimum cost value
+                    cost = np.min([tcost for tval, tcost, tpro in children], axis=0)
+                values.append((val, cost, pro))
+        val, cost, pro = values[-1]
+        return val, cost, pro, val.copy(), val.copy(), val.copy()
+
+    #Names of the vulnerabilities in the tree, which can be sampled in evaluateSamples
+    def vulNames(self):
+        program = self.program
+        if program is None:
+            program = self.compile()
+        names = []
+        for op, arg in program:
+            name = getattr(arg, 'vulname', None) if op == OP_LEAF else None
+            if name is not None and name not in names:
+                names.append(name)
+        return names
+
     #Get the impact value of each node in the attack tree
     def calcImpact(self):
-        return self.calcImpactRecursive(self.topGate)
+        return self.evaluate()[0]
 
    
-    #Calculate the attack cost value for each node in the attack tree
-    def calcCostRecursive(self, s):    
-        if s.t is "andGate":
-            val = 0
-            for u in s.con:                
-                val += self.calcCostRecursive(u) 
-        elif s.t is "orGate":
-            val = 0
-            tval = []
-            for u in s.con:
-                tval.append(self.calcCostRecursive(u))
-            #choose the minimum cost value
-            val = min(tval)
-        elif s.t is "node":
-            val = s.val
-        else:
-            val = 0
-        return val
-    
     #Get the attack cost value of each node in the attack tree
     def calcCost(self):
-        return self.calcCostRecursive(self.topGate)
+        return self.evaluate()[1]
 
 
-    #Calculate the probability value for each node in the attack tree
-    def calcProRecursive(self, s):      
-        if s.t is "andGate":
-            val = 1.0
-            for u in s.con:                
-                val *= self.calcProRecursive(u) #probability
-        elif s.t is "orGate":
-            val = 1.0
-            for u in s.con:
-                tval = self.calcProRecursive(u)
-                if tval > 0:
-                    val *= (1.0-self.calcProRecursive(u)) #probability
-            val = 1.0-val
-        elif s.t is "node" and s.val > 0:
-            val = s.val
-        else:
-            val = 1.0
-        return val
-
     #Get the probability value of each node in the attack tree
     def calcPro(self):
-        return self.calcProRecursive(self.topGate)
+        return self.evaluate()[2]
 
 
-    #Calculate the risk value for each node in the attack tree
-    def calcRiskRecursive(self, s):    
-        if s.t is "andGate":
-            val = 0
-            for u in s.con:                
-                val += self.calcRiskRecursive(u) 
-                #print ('and:', val)
-        elif s.t is "orGate":
-            val = 0
-            for u in s.con:
-                tval = self.calcRiskRecursive(u)
-                if tval >= val:
-                    val = tval 
-        elif s.t is "node":
-            val = s.val
-        else:
-            val = 0
-        return val
-    
     #Get the risk value of each node in the attack tree
     def calcRisk(self):
-        return self.calcRiskRecursive(self.topGate)
+        return self.evaluate()[3]
 
 
-    #Calculate the return on attack path value for each node in the attack tree
-    def calcReturnOnAttackRecursive(self, s):    
-        if s.t is "andGate":
-            val = 0
-            for u in s.con:                
-                val += self.calcReturnOnAttackRecursive(u) 
-                #print ('and:', val)
-        elif s.t is "orGate":
-            val = 0
-            for u in s.con:
-                tval = self.calcReturnOnAttackRecursive(u)
-                if tval >= val:
-                    val = tval 
-        elif s.t is "node":
-            val = s.val
-        else:
-            val = 0
-        return val
-    
     #Get the return on attack path value of each node in the attack tree
     def calcReturnOnAttack(self):
-        return self.calcReturnOnAttackRecursive(self.topGate)
+        return self.evaluate()[4]
     
     
-    #Calculate the mean-time-to-compromise value for each node in the attack tree
-    def calcMTTCRecursive(self, s):    
-        if s.t is "andGate":
-            val = 0
-            for u in s.con:                
-                val += self.calcMTTCRecursive(u) 
-                #print ('and:', val)
-        elif s.t is "orGate":
-            val = 0
-            for u in s.con:
-                tval = self.calcMTTCRecursive(u)
-                if tval >= val:
-                    val = tval 
-        elif s.t is "node":
-            val = s.val
-        else:
-            val = 0
-        return val
-    
     #Get the mean-time-to-compromise value of each node in the attack tree
     def calcMTTC(self):
-        return self.calcMTTCRecursive(self.topGate)
+        return self.evaluate()[5]
 
     #When only one node is in the attack tree, calculate the value for the node
     def getNodeValue(self, s):    
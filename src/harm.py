@@ -6,6 +6,7 @@ This module constructs HARMs using AG, AT in both upper and lower layers.
 
 from attackGraph import *
 from attackTree import *
+from collections import OrderedDict
 
 class harm(object):
     """
@@ -14,8 +15,129 @@ class harm(object):
     def __init__(self):
         self.model = None
 
-    def constructHarm(self, net, up, valueUp, lo, valueLow, pri):
-        self.model = makeHARM(net, up, valueUp, lo, valueLow, pri)
+    def constructHarm(self, net, up, valueUp, lo, valueLow, pri, cache=None):
+        if cache is not None and up.lower().find("attackgraph") >= 0:
+            self.model = cache.get(net, up, valueUp, lo, valueLow, pri)
+        else:
+            self.model = makeHARM(net, up, valueUp, lo, valueLow, pri)
+
+
+class treeCache(object):
+    """
+    Cache lower layer attack trees by vulnerability signature, evicting the least recently used.
+    Nodes with the same vulnerabilities (same CVEs, values, privileges and connections) get the same
+    attack tree, so it is built once and shared. Shared trees must not be modified.
+    A tree keeps the vulnerabilities it was built from, so the size is bounded for long simulation sweeps
+    where vulnerabilities keep changing (e.g. diversity).
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, vul, val, pri):
+        key = vulSignature(vul, val, pri)
+        tree = self.trees.get(key)
+        if tree is None:
+            self.misses += 1
+            tree = at(vul, val, pri)
+            self.trees[key] = tree
+            if len(self.trees) > self.maxsize:
+                self.trees.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self.trees.move_to_end(key)
+        return tree
+
+    def clear(self):
+        self.trees.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {'trees': len(self.trees), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def vulSignature(vul, val, pri):
+    """
+    Canonical signature of a vulnerability network: everything the attack tree construction reads.
+    """
+    nodes = [u for u in [vul.s, vul.e] + vul.nodes if u is not None]
+    index = {}
+    for i in range(0, len(nodes)):
+        index.setdefault(id(nodes[i]), i)
+    entries = []
+    for u in nodes:
+        entries.append((type(u) is vulNode, u.name, u.privilege, u.val, u.isStart, u is vul.s, u is vul.e,
+                        tuple([index.get(id(v)) for v in u.con])))
+    return (val, pri, tuple(entries))
+
+#Lower layer attack trees shared by all HARMs
+templates = treeCache()
+
+
+class harmCache(object):
+    """
+    Cache HARMs with an attack graph upper layer by topology fingerprint, evicting the least recently used.
+    A HARM is built once per fingerprint and kept unmodified; every request gets a clone (see ag.clone)
+    which shares its lower layers and attack paths, so repeated topologies (identical GA candidates,
+    recurring shuffles) are analysed once.
+    """
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, net, up, vu, lo, vl, pri):
+        key = (up.lower(), vu, lo.lower(), vl, pri, harmFingerprint(net))
+        model = self.models.get(key)
+        if model is None:
+            self.misses += 1
+            model = makeHARM(net, up, vu, lo, vl, pri)
+            self.models[key] = model
+            if len(self.models) > self.maxsize:
+                self.models.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self.models.move_to_end(key)
+        return model.clone(net)
+
+    def clear(self):
+        self.models.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {'models': len(self.models), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def harmFingerprint(net):
+    """
+    Canonical fingerprint of a network: node names, connections, node states (including compromise
+    flags) and vulnerability signatures.
+    """
+    topo = net.topology()
+    entries = []
+    for u in topo.nodes:
+        entry = (u.name, getattr(u, 'type', None), getattr(u, 'pro', None), getattr(u, 'critical', None),
+                 getattr(u, 'comp', None), getattr(u, 'prev_comp', None))
+        vul = getattr(u, 'vul', None)
+        if vul is not None:
+            #Values used by the system risk besides the attack tree inputs
+            entry += (vulSignature(vul, None, None), tuple([(v.exploitability, v.impact, v.cost) for v in vul.nodes]))
+        entries.append(entry)
+    return (tuple(entries), tuple([tuple(succ) for succ in topo.adj]))
+
+#HARMs shared by constructHARM
+harms = harmCache()
 
     
 def addToTreeRecursive(gate, childType, val, pri):
@@ -24,7 +146,7 @@ def addToTreeRecursive(gate, childType, val, pri):
             if (u.n is not None) and (u.n.vul is not None):
                 childType = childType.lower()
                 if childType.find("attacktree") >= 0:
-                    u.child = at(u.n.vul, val, pri)
+                    u.child = templates.get(u.n.vul, val, pri)
                 elif childType.find("attackgraph") >= 0:
                     u.child = ag(u.n.vul, val, pri)
                 else:
@@ -39,13 +161,17 @@ def addToGraph(aG, childType, val, pri):
     for u in aG.nodes:
         if (u.n is not None) and (u.n.vul is not None):
             childType = childType.lower()
-            if childType.find("attacktree") >= 0:
-                u.child = at(u.n.vul, val, pri)
-            elif childType.find("attackgraph") >= 0:
-                u.child = ag(u.n.vul, val, pri)
+            if childType.find("attacktree") >= 0 or childType.find("attackgraph") >= 0:
+                #Lower layers are built when a metric first needs them
+                u.setLazyChild(makeLowerLayer, u.n.vul, childType, val, pri)
             else:
                 print("Error")
 
+def makeLowerLayer(vul, childType, val, pri):
+    if childType.find("attacktree") >= 0:
+        return templates.get(vul, val, pri)
+    return ag(vul, val, pri)
+
 def makeHARM(net, up, vu, lo, vl, pri):
     """
     Construct HARM.
@@ -76,7 +202,7 @@ def makeHARM(net, up, vu, lo, vl, pri):
     if harm is not None:
         if type(harm) is ag:
             addToGraph(harm, lo, vl, pri)
-            harm.calcPath() #Compute attack path
+            harm.resetPath() #Attack paths are computed on first use
         else:
             addToTree(harm, lo, vl, pri)
 
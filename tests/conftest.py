@@ -0,0 +1,8 @@
+"""
+The modules live flat in src/ and import each other by name, so put src/ on the path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
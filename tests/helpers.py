@@ -0,0 +1,34 @@
+"""
+Networks shared by the tests.
+"""
+
+import contextlib
+import io
+import random
+import SimulationBasic as sb
+
+node_vlan_list = [['mri', 'ct'], ['thermostat', 'meter', 'camera'], ['tv', 'laptop'], ['server']]
+decoy_num = {'mri': 1, 'ct': 1, 'thermostat': 1, 'meter': 1, 'camera': 1, 'tv': 1, 'laptop': 1, 'server': 1}
+intelligence = {'emulated': 0.9, 'real': 1.0}
+
+
+def decoyNetwork(seed, scale=None, shuffles=1):
+    """
+    Build the real network and a randomly shuffled decoy network (quietly, the generators print).
+
+    :param scale: number of real IoT devices per type (see beforeShuffleScale); None for the small network
+    :returns: real network, decoy network, decoy names and deployment information
+    """
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scale is None:
+            net, decoy_net, decoy_list, info = sb.beforeShuffle(node_vlan_list, decoy_num, intelligence, 0.1, 0.01)
+        else:
+            net, decoy_net, decoy_list, info = sb.beforeShuffleScale(node_vlan_list, decoy_num, intelligence, 0.1, 0.01, scale)
+        for i in range(0, shuffles):
+            decoy_net, cost = sb.randomShuffling(decoy_net, 0.97)
+    return net, decoy_net, decoy_list, info
+
+
+def pathNames(h):
+    return [[u.name for u in path] for path in h.model.allpath]
@@ -0,0 +1,30 @@
+"""
+Tests for updating computed attack paths after connection changes (see applyEdgeDelta).
+"""
+
+import random
+import SimulationBasic as sb
+from helpers import decoyNetwork
+
+
+def rebuiltPaths(g):
+    #Enumerate the attack paths of the changed graph from scratch
+    nodes = g.topology().nodes
+    return [[nodes[i].name for i in ids] for ids in g.walkPathIds()]
+
+
+def test_incremental_update_matches_rebuild():
+    for seed in [1, 2, 3, 4]:
+        net, decoy_net, decoy_list, info = decoyNetwork(seed)
+        g = sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net))).model
+        g.allpath
+        rand = random.Random(seed)
+        #Nodes of the attack graph other than the start and end points
+        nodes = [u for u in g.nodes if u.child is not None]
+        for step in range(0, 4):
+            edges = [(u, v) for u in nodes for v in u.con if v.child is not None]
+            removed = rand.sample(edges, 2)
+            added = [tuple(rand.sample(nodes, 2)) for i in range(0, 3)] + removed[:1]
+            g.applyEdgeDelta(added=added, removed=removed)
+            assert g.computedPaths() is not None
+            assert [[u.name for u in path] for path in g.allpath] == rebuiltPaths(g)
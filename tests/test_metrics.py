@@ -0,0 +1,66 @@
+"""
+Tests for the attack path metrics.
+"""
+
+import random
+import numpy as np
+import pytest
+import SimulationBasic as sb
+from Metrics import *
+from helpers import decoyNetwork
+
+
+def harmFor(seed, svrd=False, scale=None):
+    net, decoy_net, decoy_list, info = decoyNetwork(seed, scale)
+    h = sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net)))
+    if svrd:
+        #decoyProceedPro follows the paths to decoy servers named svrd
+        for u in h.model.nodes:
+            u.name = u.name.replace('decoy_server', 'decoy_svrd')
+        h.model.touch()
+    return h
+
+
+def test_decoy_proceed_pro_requires_probabilities_on_decoy_paths():
+    h = harmFor(1, True)
+    flat, offsets, topo, targets = decoyPathArrays(h)
+    assert len(targets) > 0
+    expected = decoyProceedPro(h)
+    onTarget = set()
+    for k in targets:
+        onTarget.update(flat[offsets[k]:offsets[k+1]].tolist())
+    #A node off the paths to decoy servers does not count
+    others = [u for i, u in enumerate(topo.nodes) if i not in onTarget]
+    assert others
+    for u in others:
+        u.pro = None
+    assert decoyProceedPro(h) == expected
+    #A node on one of them has to have a probability
+    u = topo.nodes[flat[offsets[targets[0]]+2]]
+    u.pro = None
+    with pytest.raises(TypeError):
+        decoyProceedPro(h)
+
+
+def test_estimates_converge_to_exact_metrics():
+    h = harmFor(1, scale=2)
+    exact = {"NP": NP_metric(h), "MPL": MPL_metric(h), "decoyPath": decoyPath(h)}
+    assert exact["NP"] > 100 and exact["decoyPath"] > 0
+    rand = random.Random(3)
+    #Largest relative error of the estimates by number of samples
+    errors = []
+    for samples in [100, 1000, 10000]:
+        estimates = estimatePathMetrics(h, samples, rand, 0.999)
+        errors.append(max(abs(estimates[name][0]/value - 1.0) for name, value in exact.items()))
+    for name, value in exact.items():
+        estimate, variance, (lower, upper) = estimates[name]
+        assert lower <= value <= upper, (name, estimates[name], value)
+    assert errors[-1] < 0.05
+    assert errors[-1] < errors[0]
+
+
+def test_estimates_need_samples():
+    h = harmFor(1)
+    for samples in [0, -1]:
+        with pytest.raises(ValueError):
+            estimatePathMetrics(h, samples)
@@ -0,0 +1,23 @@
+"""
+Tests for computing node values on demand (see ag.nodeValue).
+"""
+
+import numpy as np
+import SimulationBasic as sb
+from attackGraph import metricNames
+from helpers import decoyNetwork
+
+
+def test_node_value_builds_only_its_lower_layer():
+    net, decoy_net, decoy_list, info = decoyNetwork(3)
+    g = sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net))).model
+    other = sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net))).model
+    topo = g.topology()
+    i = topo.idOf(g.nodes[0])
+    value = g.nodeValue('mttc', i)
+    assert [u for u in g.nodes if u._child is not None] == [g.nodes[0]]
+    assert value == other.nodeValues()['mttc'][i]
+    #The remaining nodes are computed by nodeValues, the visited one is kept
+    values = g.nodeValues()
+    for name in metricNames:
+        assert np.array_equal(values[name], other.nodeValues()[name], equal_nan=True)
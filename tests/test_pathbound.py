@@ -0,0 +1,31 @@
+"""
+Tests for bounding the attack path length of the HARMs built by the scalability simulations.
+"""
+
+import contextlib
+import io
+import random
+import pytest
+import SimulationBasic as sb
+
+node_vlan_list = [['mri', 'ct'], ['thermostat', 'meter', 'camera'], ['tv', 'laptop'], ['server']]
+decoy_num = {'mri': 1, 'ct': 1, 'thermostat': 1, 'meter': 1, 'camera': 1, 'tv': 1, 'laptop': 1, 'server': 1}
+
+
+def names(h):
+    return [[u.name for u in path] for path in h.model.allpath]
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_bounded_paths_equal_filtered_paths(seed):
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        initial_net, decoy_net, decoy_list, info = sb.beforeShuffleScale(node_vlan_list, decoy_num, {'emulated': 0.9, 'real': 1.0}, 0.1, 0.01, 2)
+        decoy_net, cost = sb.randomShuffling(decoy_net, 0.97)
+    full = names(sb.shuffleHARM(decoy_net)[1])
+    for pathLength in [1, 2, 4, 6]:
+        h = sb.shuffleHARM(decoy_net, pathLength)[1]
+        #Paths run from the start through the attacker to the end point
+        assert names(h) == [path for path in full if len(path) - 3 <= pathLength]
+        assert h.model.countPaths() == len(names(h))
+    assert len(full) > len(names(sb.shuffleHARM(decoy_net, 2)[1]))
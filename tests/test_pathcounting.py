@@ -0,0 +1,56 @@
+"""
+Tests for counting simple paths inside strongly connected components.
+"""
+
+import math
+import random
+import sys
+import pytest
+import PathCounting
+from PathCounting import countSimplePaths
+from ParallelPaths import countPathsParallel
+
+
+def test_long_cycle_beyond_recursion_limit():
+    n = sys.getrecursionlimit() + 200
+    adj = [[(i+1) % n] for i in range(0, n)]
+    #From every node: the node itself and one path per further node around the cycle
+    assert countSimplePaths(adj, [True] * n, [1] * n) == [n] * n
+
+
+def test_complete_component():
+    n = 7
+    adj = [[j for j in range(0, n) if j != i] for i in range(0, n)]
+    expected = sum(math.factorial(n-1) // math.factorial(n-1-k) for k in range(0, n))
+    assert countSimplePaths(adj, [True] * n, [1] * n) == [expected] * n
+
+
+def test_too_many_states(monkeypatch):
+    monkeypatch.setattr(PathCounting, 'maxComponentStates', 10000)
+    n = 20
+    adj = [[j for j in range(0, n) if j != i] for i in range(0, n)]
+    with pytest.raises(ValueError):
+        countSimplePaths(adj, [True] * n, [1] * n)
+
+
+def test_count_from_roots():
+    rand = random.Random(5)
+    for trial in range(0, 300):
+        n = rand.randint(1, 10)
+        adj = [[rand.randrange(n) for k in range(0, rand.randint(0, 4))] for i in range(0, n)]
+        ok = [rand.random() < 0.85 for i in range(0, n)]
+        weight = [rand.randint(0, 2) for i in range(0, n)]
+        full = countSimplePaths(adj, ok, weight)
+        roots = rand.sample(range(0, n), rand.randint(1, min(3, n)))
+        part = countSimplePaths(adj, ok, weight, roots)
+        assert [part[v] for v in roots] == [full[v] for v in roots]
+
+
+def test_parallel_count_matches_serial():
+    rand = random.Random(7)
+    n = 12
+    adj = [[rand.randrange(n) for k in range(0, 3)] for i in range(0, n)]
+    ok = [True] * n
+    weight = [rand.randint(0, 2) for i in range(0, n)]
+    for s in range(0, 3):
+        assert countPathsParallel(adj, ok, weight, s, 2) == countSimplePaths(adj, ok, weight)[s]
@@ -0,0 +1,39 @@
+"""
+Tests for the order in which the attacker picks attack paths.
+"""
+
+import collections
+import random
+import SimulationBasic as sb
+from helpers import decoyNetwork, pathNames
+
+
+def harmFor(seed):
+    net, decoy_net, decoy_list, info = decoyNetwork(seed)
+    return sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net)))
+
+
+def test_random_order_is_a_shuffle_of_all_paths():
+    h = harmFor(1)
+    paths = pathNames(h)
+    for seed in range(0, 5):
+        expected = paths[:]
+        random.Random(seed).shuffle(expected)
+        assert [[u.name for u in path] for path in h.model.iterPaths(random.Random(seed))] == expected
+
+
+def test_first_path_is_uniform():
+    h = harmFor(3)
+    n = len(h.model.allpath)
+    rand = random.Random(7)
+    draws = 200 * n
+    first = collections.Counter(tuple(u.name for u in next(h.model.iterPaths(rand))) for i in range(0, draws))
+    assert len(first) == n
+    assert max(first.values()) < 1.5 * draws / n
+
+
+def test_walk_is_opt_in():
+    h = harmFor(3)
+    paths = set(tuple(path) for path in pathNames(h))
+    walked = [tuple(u.name for u in path) for path in h.model.iterPaths(random.Random(1), walk=True)]
+    assert sorted(walked) == sorted(paths)
@@ -0,0 +1,59 @@
+"""
+Tests for building lower layers with shared sub-gates (see at.constructShared).
+"""
+
+import pytest
+from harm import *
+from helpers import decoyNetwork
+#After the star import, which brings random.random
+import random
+
+
+def randomVul(rand, k, density):
+    u = device('dev')
+    vuls = []
+    for i in range(0, k):
+        v = vulNode('CVE-' + str(i))
+        v.createVul(u, rand.choice([0.0, 0.006, 0.012, 0.1, 0.5, 0.9]), rand.choice([0, 1, 1, 2]))
+        vuls.append(v)
+    for v in vuls:
+        for w in vuls:
+            if v is not w and rand.random() < density:
+                v.con.append(w)
+    vuls[0].thresholdPri(u, 1)
+    vuls[0].terminalPri(u, 1)
+    return u.vul
+
+
+def trees(vul, monkeypatch):
+    result = []
+    for shared in [False, True]:
+        monkeypatch.setattr(at, 'shareGates', shared)
+        try:
+            t = at(vul, 1, 1)
+            result.append((t.evaluate(), t.vulNames()))
+        except Exception as err:
+            result.append(type(err))
+    return result
+
+
+def test_shared_gates_match_tree_on_devices(monkeypatch):
+    for seed in [1, 2, 3]:
+        net, decoy_net, decoy_list, info = decoyNetwork(seed, scale=2)
+        vuls = [u.vul for u in decoy_net.nodes if u.vul is not None]
+        assert vuls
+        for vul in vuls:
+            plain, shared = trees(vul, monkeypatch)
+            assert shared == plain
+
+
+def test_shared_gates_match_tree_with_many_vulnerabilities(monkeypatch):
+    built = 0
+    for seed in range(0, 5):
+        rand = random.Random(seed)
+        for trial in range(0, 40):
+            vul = randomVul(rand, rand.randint(4, 10), rand.choice([0.2, 0.35, 0.5]))
+            plain, shared = trees(vul, monkeypatch)
+            assert shared == plain
+            built += not isinstance(plain, type)
+    assert built > 100
@@ -0,0 +1,39 @@
+"""
+Tests for saving and loading HARM snapshots.
+"""
+
+import random
+import numpy as np
+import SimulationBasic as sb
+import SecurityEvaluator as se
+from HarmSnapshot import saveHARM, loadHARM
+from helpers import decoyNetwork, pathNames
+
+
+def mttsf(h, net, info):
+    random.seed(5)
+    return [se.computeMTTSF(h, sb.copyNet(net), info["threshold"]) for i in range(0, 5)]
+
+
+def test_round_trip(tmp_path):
+    for seed in [1, 2]:
+        net, decoy_net, decoy_list, info = decoyNetwork(seed)
+        h = sb.constructHARM(sb.add_attacker(sb.copyNet(decoy_net)))
+        paths = pathNames(h)
+        values = h.model.nodeValues()
+        filename = str(tmp_path / ('harm%d.npz' % seed))
+        saveHARM(h, filename)
+        loaded = loadHARM(filename)
+        #MTTSF marks compromised nodes, so it runs after saving
+        before = mttsf(h, net, info)
+
+        topo = h.model.topology()
+        assert loaded.model.topology().names == topo.names
+        #Decoy types ('emulated', 'real') are kept, not turned into flags
+        assert [u.type for u in loaded.model.topology().nodes] == [u.type for u in topo.nodes]
+        assert 'emulated' in [u.type for u in topo.nodes]
+        assert pathNames(loaded) == paths
+        for name in values:
+            assert np.array_equal(loaded.model.nodeValues()[name], values[name], equal_nan=True)
+        assert loaded.system_risk == h.system_risk
+        assert mttsf(loaded, net, info) == before
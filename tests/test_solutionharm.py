@@ -0,0 +1,38 @@
+"""
+Tests for evaluating candidate solutions as masks over the union HARM (see solution_harm).
+"""
+
+import random
+import SimulationBasic as sb
+import SecurityEvaluator as se
+from SDIoTGen import add_attacker, add_solution_real_decoy, solution_union, solution_harm
+from Metrics import decoyPath
+from helpers import decoyNetwork, pathNames
+
+
+def evaluate(h, net, info):
+    random.seed(11)
+    mttsf = [se.computeMTTSF(h, sb.copyNet(net), info["threshold"]) for i in range(0, 5)]
+    return pathNames(h), decoyPath(h), mttsf, h.system_risk
+
+
+def candidates(previous, rand, flips):
+    #Flip a few bits of the previous solution, so connections are both added and removed
+    result = [list(previous), [0] * len(previous)]
+    for i in range(0, 5):
+        result.append([1 - b if rand.random() < flips else b for b in previous])
+    return result
+
+
+def test_masked_union_matches_rebuild():
+    for seed in [1, 2, 3]:
+        net, decoy_net, decoy_list, info = decoyNetwork(seed, shuffles=0)
+        rand = random.Random(seed)
+        #Shuffle once, as the simulations do, so the next solutions can also remove connections
+        first = [rand.randint(0, 1) for b in info["previous_solution"]]
+        shuffled_net = add_solution_real_decoy(decoy_net, first, info, list(decoy_list))
+        info = dict(info, previous_solution=first)
+        union = solution_union(shuffled_net, info, list(decoy_list))
+        for candidate in candidates(first, rand, 0.1):
+            rebuilt = sb.constructHARM(add_attacker(add_solution_real_decoy(shuffled_net, candidate, info, list(decoy_list))))
+            assert evaluate(solution_harm(union, candidate, info), net, info) == evaluate(rebuilt, net, info)
@@ -0,0 +1,122 @@
+"""
+Tests for the edge transactions of network (begin, commit, rollback, transaction).
+"""
+
+import pytest
+from Network import *
+
+
+def makeNet(prefix, size=5):
+    net = network()
+    for i in range(0, size):
+        net.nodes.append(realNode(prefix + str(i)))
+    for i in range(0, size-1):
+        connectOneWay(net.nodes[i], net.nodes[i+1])
+    net.topology()
+    return net
+
+
+def state(net):
+    return [[v.name for v in u.con] for u in net.nodes]
+
+
+def test_rollback_restores_connection_order():
+    A = makeNet('a')
+    connectOneWay(A.nodes[0], A.nodes[3])
+    before = state(A)
+    A.begin()
+    disconnectOneWay(A.nodes[0], A.nodes[1])
+    connectTwoWays(A.nodes[2], A.nodes[4])
+    disconnectTwoWays(A.nodes[3], A.nodes[4])
+    A.apply(added=[(A.nodes[4], A.nodes[0])], removed=[(A.nodes[0], A.nodes[3])])
+    A.rollback()
+    assert state(A) == before
+
+
+def test_rollback_leaves_other_networks():
+    A = makeNet('a')
+    B = makeNet('b')
+    A.begin()
+    connectOneWay(B.nodes[2], B.nodes[4])
+    connectOneWay(A.nodes[0], A.nodes[2])
+    A.rollback()
+    assert [v.name for v in B.nodes[2].con] == ['b3', 'b4']
+    assert [v.name for v in A.nodes[0].con] == ['a1']
+
+
+def test_nested_transaction_of_other_network():
+    A = makeNet('a')
+    B = makeNet('b')
+    A.begin()
+    connectOneWay(A.nodes[0], A.nodes[4])
+    B.begin()
+    connectOneWay(B.nodes[0], B.nodes[4])
+    B.commit()
+    A.rollback()
+    assert [v.name for v in B.nodes[0].con] == ['b1', 'b4']
+    assert [v.name for v in A.nodes[0].con] == ['a1']
+    with pytest.raises(ValueError):
+        B.rollback()
+
+
+def test_nested_commit_is_rolled_back_by_outer():
+    A = makeNet('a')
+    before = state(A)
+    A.begin()
+    connectOneWay(A.nodes[0], A.nodes[2])
+    A.begin()
+    connectOneWay(A.nodes[1], A.nodes[3])
+    A.commit()
+    A.rollback()
+    assert state(A) == before
+
+
+def test_transaction_context_always_ends():
+    A = makeNet('a')
+    before = state(A)
+    with pytest.raises(RuntimeError):
+        with A.transaction(keep=True):
+            connectOneWay(A.nodes[0], A.nodes[3])
+            raise RuntimeError()
+    assert state(A) == before
+    with A.transaction():
+        connectOneWay(A.nodes[0], A.nodes[3])
+    assert state(A) == before
+    with A.transaction(keep=True):
+        connectOneWay(A.nodes[0], A.nodes[3])
+    assert [v.name for v in A.nodes[0].con] == ['a1', 'a3']
+    with pytest.raises(ValueError):
+        A.rollback()
+    #No open transaction: changes are not logged
+    connectOneWay(A.nodes[1], A.nodes[4])
+    assert A._undoLogs == []
+
+
+def test_rollback_restores_topology():
+    A = makeNet('a')
+    topo = A.topology()
+    with A.transaction():
+        connectOneWay(A.nodes[0], A.nodes[4])
+        assert A.topology().adj[0] == [1, 4]
+    assert A.topology() is topo
+    #A direct change is not recorded, so the topology of the transaction start is not reused
+    with A.transaction():
+        connectOneWay(A.nodes[0], A.nodes[4])
+        A.nodes[2].con.append(A.nodes[0])
+        A.touch()
+    assert A.topology() is not topo
+    assert A.topology().adj[0] == [1]
+    assert A.topology().adj[2] == [3, 0]
+
+
+def test_connect_after_direct_edits():
+    A = makeNet('a')
+    #Already connected, checked before the direct changes
+    connectOneWay(A.nodes[0], A.nodes[1])
+    connectOneWay(A.nodes[1], A.nodes[2])
+    #Connections changed directly, without touch
+    A.nodes[0].con.append(A.nodes[2])
+    A.nodes[1].con.remove(A.nodes[2])
+    connectOneWay(A.nodes[0], A.nodes[2])
+    connectTwoWays(A.nodes[1], A.nodes[2])
+    assert state(A)[0:3] == [['a1', 'a2'], ['a2'], ['a3', 'a1']]
@@ -0,0 +1,48 @@
+"""
+Tests for the lower layer attack tree cache.
+"""
+
+import gc
+import weakref
+from harm import *
+
+
+def makeVul(value):
+    u = realNode('node')
+    v = vulNode('CVE-' + str(value))
+    v.createVul(u, value, 1)
+    v.thresholdPri(u, 1)
+    v.terminalPri(u, 1)
+    return u.vul
+
+
+def test_shared_tree():
+    cache = treeCache()
+    assert cache.get(makeVul(0.5), 0, 1) is cache.get(makeVul(0.5), 0, 1)
+    assert cache.stats() == {'trees': 1, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+
+def test_evicted_trees_are_released():
+    cache = treeCache(maxsize=2)
+    refs = []
+    for i in range(0, 4):
+        vul = makeVul(0.1 * (i+1))
+        refs.append((weakref.ref(cache.get(vul, 0, 1)), weakref.ref(vul)))
+        del vul
+    gc.collect()
+    assert cache.stats()['trees'] == 2
+    assert cache.stats()['evictions'] == 2
+    #The least recently used trees and the vulnerabilities they were built from are gone
+    assert [tree() is None for tree, vul in refs] == [True, True, False, False]
+    assert [vul() is None for tree, vul in refs] == [True, True, False, False]
+
+
+def test_recently_used_tree_is_kept():
+    cache = treeCache(maxsize=2)
+    first = makeVul(0.1)
+    tree = cache.get(first, 0, 1)
+    cache.get(makeVul(0.2), 0, 1)
+    assert cache.get(first, 0, 1) is tree
+    cache.get(makeVul(0.3), 0, 1)
+    assert cache.get(first, 0, 1) is tree
+    assert cache.stats()['evictions'] == 1